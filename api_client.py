@@ -0,0 +1,52 @@
+import pandas as pd
+import requests
+
+import perf
+
+
+class RecipeApiClient:
+    """
+    api_server.py의 HTTP 엔드포인트를 호출하는 클라이언트입니다.
+    search_logic의 함수들과 같은 형태(DataFrame/dict)로 결과를 반환하므로 Streamlit 앱에서 그대로 바꿔 쓸 수 있습니다.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, path: str, payload: dict):
+        with perf.trace(f"api{path}"):
+            response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def search_by_name(self, query: str, nation_code: int = None, type_code: int = None, top_k: int = 15):
+        payload = {"query": query, "nation_code": _code(nation_code), "type_code": _code(type_code), "top_k": top_k}
+        return pd.DataFrame(self._post("/search/name", payload)["results"])
+
+    def search_by_name_batch(self, queries):
+        """queries: search_by_name()의 인자와 같은 키를 가진 dict 리스트. DataFrame 리스트를 반환합니다."""
+        payload = {"queries": [{**q, "nation_code": _code(q.get("nation_code")), "type_code": _code(q.get("type_code"))} for q in queries]}
+        return [pd.DataFrame(rows) for rows in self._post("/search/name/batch", payload)["results"]]
+
+    def search_by_ingredient(self, keyword: str, nation_code: int = None, type_code: int = None):
+        payload = {"keyword": keyword, "nation_code": _code(nation_code), "type_code": _code(type_code)}
+        return pd.DataFrame(self._post("/search/ingredient", payload)["results"])
+
+    def fetch_recipe_detail(self, recipe_id: int):
+        with perf.trace("api/recipes"):
+            response = self.session.get(f"{self.base_url}/recipes/{int(recipe_id)}", timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def calculate_nutrition(self, items):
+        payload = {"items": [{"name": i["name"], "weight": i.get("weight", 0)} for i in items if i.get("name")]}
+        return self._post("/nutrition", payload)["total"]
+
+
+def _code(value):
+    """NATION_INFO/TYPE_INFO에서 읽은 코드(문자열일 수 있음)를 정수로 변환합니다."""
+    return int(value) if value not in (None, "") else None
@@ -0,0 +1,227 @@
+"""
+Streamlit UI와 분리된 레시피 검색 API 서버(ASGI)입니다.
+
+모델과 인메모리 임베딩 인덱스는 프로세스당 한 번만 로드하여 모든 요청이 공유하며,
+CPU를 쓰는 인코딩/점수 계산과 SQLite 조회는 워커 스레드 풀에서 실행하여 이벤트 루프를 막지 않습니다.
+
+실행:
+    uvicorn api_server:app --host 0.0.0.0 --port 8000
+환경 변수:
+    RECIPE_API_WORKERS  워커 스레드 수 (기본: CPU 코어 수)
+    RECIPE_DB_FILE      사용할 SQLite DB 경로
+    RECIPE_SHARED_INDEX_DIR
+                        설정 시 shared_index.py로 게시된 메모리 맵 인덱스에 읽기 전용으로 연결합니다.
+                        여러 워커 프로세스(uvicorn --workers N)가 임베딩 행렬 한 벌을 공유하며,
+                        새 세대가 게시되면 자동으로 전환됩니다.
+    RECIPE_ADMIN_TOKEN  설정 시 X-Admin-Token 헤더로 이 값을 보낸 요청만 /admin/reload-index를 사용할 수 있습니다.
+                        설정하지 않으면 관리 엔드포인트는 비활성(404)이며, 'python snapshot.py build' 후 서버를 재시작합니다.
+    RECIPE_SNAPSHOT_DIR 공유 인덱스를 쓰지 않을 때 시작 시 연결할 스냅샷 디렉터리 (기본: data/snapshot)
+                        DB 세대가 같으면 임베딩을 다시 디코딩하지 않고 스냅샷을 메모리 맵으로 연결합니다.
+"""
+import asyncio
+import json
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException
+from pydantic import BaseModel, Field
+
+import perf
+from search_index import EmbeddingIndex
+from shared_index import SharedIndexReader, ensure_published
+from snapshot import load_or_build
+from search_logic import load_bert_model, active_model_name, search_by_ingredient, fetch_recipe_detail, calculate_nutrition
+
+MAX_BATCH_SIZE = 64
+
+
+class SearchNameRequest(BaseModel):
+    query: str
+    nation_code: Optional[int] = None
+    type_code: Optional[int] = None
+    top_k: int = Field(15, ge=1, le=100)
+
+
+class SearchNameBatchRequest(BaseModel):
+    queries: List[SearchNameRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class SearchIngredientRequest(BaseModel):
+    keyword: str
+    nation_code: Optional[int] = None
+    type_code: Optional[int] = None
+
+
+class NutritionItem(BaseModel):
+    name: str
+    weight: float = Field(100, ge=0)
+
+
+class NutritionRequest(BaseModel):
+    items: List[NutritionItem]
+
+
+class _State:
+    """프로세스 전역에서 공유하는 모델/인덱스/워커 풀입니다."""
+    model = None
+    model_name: str = None
+    model_lock = threading.Lock()
+    index: EmbeddingIndex = None
+    reader: SharedIndexReader = None
+    executor: ThreadPoolExecutor = None
+
+
+state = _State()
+
+
+def current_index() -> EmbeddingIndex:
+    """공유 인덱스 모드에서는 최신 세대를, 아니면 프로세스 내 인덱스를 반환합니다."""
+    return state.reader.get() if state.reader is not None else state.index
+
+
+def model_for(index):
+    """
+    index의 임베딩을 만든 모델로 쿼리를 인코딩할 모델을 반환합니다. 임베딩 재생성으로 새 세대의 모델이 바뀌면
+    그 모델을 로드하여 교체합니다. (기록이 없는 인덱스는 현재 모델을 그대로 사용)
+    """
+    name = getattr(index, "model_name", None) or state.model_name
+    if name != state.model_name or state.model is None:
+        with state.model_lock:
+            if name != state.model_name or state.model is None:
+                if state.model is not None:
+                    print(f"Recipe API: embedding model changed {state.model_name} -> {name}, reloading query encoder.")
+                state.model, state.model_name = load_bert_model(name), name
+    return state.model
+
+
+def _records(df):
+    """DataFrame을 JSON 직렬화 가능한 레코드 리스트로 변환합니다."""
+    if df is None or df.empty:
+        return []
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def _plain(value):
+    """numpy 스칼라를 파이썬 기본 타입으로 변환합니다."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """블로킹 함수를 워커 스레드 풀에서 실행합니다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(state.executor, partial(func, *args, **kwargs))
+
+
+def _search_names(requests: List[SearchNameRequest]):
+    """여러 쿼리를 한 번에 인코딩하고 한 번의 행렬 곱으로 점수를 계산합니다."""
+    # 요청 하나는 같은 세대의 인덱스와 그 세대의 모델을 끝까지 사용합니다.
+    index = current_index()
+    model = model_for(index)
+    with perf.trace("model.encode"):
+        query_embeddings = model.encode([r.query for r in requests])
+    results = index.search_batch(
+        query_embeddings, [(r.nation_code, r.type_code) for r in requests], top_k=max(r.top_k for r in requests)
+    )
+    return [_records(df.head(r.top_k)) for r, df in zip(requests, results)]
+
+
+def _attach_shared_index(base_dir: str):
+    """게시된 세대가 없으면 첫 세대를 게시한 뒤 연결합니다. 실패하면 None을 반환하여 스냅샷을 사용하게 합니다."""
+    try:
+        ensure_published(base_dir=base_dir)
+        return SharedIndexReader(base_dir)
+    except Exception as e:
+        print(f"Warning: 공유 인덱스를 사용할 수 없어 스냅샷을 사용합니다: {e}")
+        return None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state.executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv("RECIPE_API_WORKERS", os.cpu_count() or 4)), thread_name_prefix="recipe-api"
+    )
+    state.model_name = await run_in_pool(active_model_name)
+    if os.getenv("RECIPE_SHARED_INDEX_DIR"):
+        state.reader = await run_in_pool(_attach_shared_index, os.getenv("RECIPE_SHARED_INDEX_DIR"))
+    if state.reader is not None:
+        print(f"Recipe API attached to shared index {state.reader.generation}.")
+    else:
+        state.index = (await run_in_pool(load_or_build)).index
+    await run_in_pool(model_for, current_index())
+    print(f"Recipe API ready: {len(current_index())} recipes indexed.")
+    yield
+    state.executor.shutdown(wait=False)
+
+
+app = FastAPI(title="AI 레시피 검색 API", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    index = current_index()
+    return {
+        "status": "ok",
+        "indexed_recipes": len(index) if index is not None else 0,
+        "generation": getattr(index, "generation", None),
+    }
+
+
+@app.post("/search/name")
+async def search_name(req: SearchNameRequest):
+    results = await run_in_pool(_search_names, [req])
+    return {"results": results[0]}
+
+
+@app.post("/search/name/batch")
+async def search_name_batch(req: SearchNameBatchRequest):
+    results = await run_in_pool(_search_names, req.queries)
+    return {"results": results}
+
+
+@app.post("/search/ingredient")
+async def search_ingredient(req: SearchIngredientRequest):
+    df = await run_in_pool(search_by_ingredient, req.keyword, req.nation_code, req.type_code)
+    return {"results": _records(df)}
+
+
+@app.get("/recipes/{recipe_id}")
+async def recipe_detail(recipe_id: int):
+    details = await run_in_pool(fetch_recipe_detail, recipe_id)
+    if details is None:
+        raise HTTPException(status_code=404, detail="레시피를 찾을 수 없습니다.")
+    base = {k: _plain(v) for k, v in details["base"].items() if k != "EMBEDDING"}
+    return {"base": base, "ingredients": details["ingredients"], "process": details["process"]}
+
+
+@app.post("/nutrition")
+async def nutrition(req: NutritionRequest):
+    totals = await run_in_pool(calculate_nutrition, [item.model_dump() for item in req.items])
+    return {"total": totals}
+
+
+def _require_admin(token: Optional[str]):
+    """RECIPE_ADMIN_TOKEN과 같은 X-Admin-Token 헤더가 있어야 관리 엔드포인트를 사용할 수 있습니다. (미설정 시 비활성)"""
+    expected = os.getenv("RECIPE_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not secrets.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+
+
+@app.post("/admin/reload-index")
+async def reload_index(x_admin_token: Optional[str] = Header(None)):
+    """
+    setup_database 등으로 카탈로그가 바뀐 뒤 인덱스를 다시 읽어옵니다. DB 세대가 바뀌었으면 스냅샷을 다시 만듭니다.
+    (공유 인덱스 모드에서는 새 세대 게시로 대신합니다) 스냅샷 전체를 다시 만들 수 있으므로 관리자 토큰이 필요합니다.
+    """
+    _require_admin(x_admin_token)
+    if state.reader is not None:
+        raise HTTPException(status_code=409, detail="공유 인덱스 모드입니다. 'python shared_index.py publish'로 새 세대를 게시하세요.")
+    state.index = (await run_in_pool(load_or_build)).index
+    return {"indexed_recipes": len(state.index)}
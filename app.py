@@ -1,6 +1,9 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
+import os
 from datetime import datetime
+from functools import partial
 import plotly.express as px
 import pytz
 
@@ -17,7 +20,10 @@ if not firebase_admin._apps:
 
 firestore_db = firestore.client()
 
+import perf
+
 # --- Firebase 로그 저장 함수 (ERD 컬럼명에 맞게) ---
+@perf.timed("firestore.add")
 def log_search_to_firebase(srch_id, srch_code, srch_keyword, nation_code):
     now_korea = datetime.now(korea)
     firestore_db.collection("SEARCH_LOG").add({
@@ -28,6 +34,7 @@ def log_search_to_firebase(srch_id, srch_code, srch_keyword, nation_code):
         "SRCH_TIME": now_korea
     })
 
+@perf.timed("firestore.add")
 def log_recommend_to_firebase(rec_id, srch_id, recipe_id):
     firestore_db.collection("RECOMMEND_LOG").add({
         "REC_ID": rec_id,
@@ -35,6 +42,7 @@ def log_recommend_to_firebase(rec_id, srch_id, recipe_id):
         "RECIPE_ID": recipe_id
     })
 
+@perf.timed("firestore.add")
 def log_dwell_to_firebase(view_id, srch_id, rec_id, start_time, dwell_time):
     firestore_db.collection("DWELL_TIME_LOG").add({
         "VIEW_ID": view_id,
@@ -46,17 +54,77 @@ def log_dwell_to_firebase(view_id, srch_id, rec_id, start_time, dwell_time):
 
 from database_setup import setup_database
 from search_logic import (
-    load_bert_model, search_by_name_bert, search_by_ingredient,
-    fetch_recipe_detail, log_search, log_recommendations, log_dwell_time, db_query
+    load_bert_model, active_model_name, search_by_name_bert, search_by_name_index, search_by_ingredient,
+    fetch_recipe_detail, log_search, log_recommendations, log_dwell_time, db_query, calculate_nutrition,
+    NATION_OPTIONS_SQL, TYPE_OPTIONS_SQL, NUTRITION_NAMES_SQL, SLOW_PERF_LOG_SQL
 )
-from utils import get_youtube_videos
+from log_retention import trend_top_keywords, trend_top_viewed, trend_keyword_dwell
+from utils import get_youtube_videos, search_youtube_videos, show_youtube_error, YouTubeSearchError
+from detail_loader import start_detail_load
+from api_client import RecipeApiClient
+from shared_index import SharedIndexReader, ensure_published
+from snapshot import load_or_build, current_db_generation
+
+# RECIPE_API_URL이 설정되어 있으면 검색/상세/영양성분 계산을 API 서버(api_server.py)에 위임합니다.
+api_client = RecipeApiClient(os.getenv("RECIPE_API_URL")) if os.getenv("RECIPE_API_URL") else None
 
 # --- 페이지 기본 설정 ---
 st.set_page_config(layout="wide", page_title="AI 레시피 추천 서비스")
 
+# --- 성능 측정: 이번 rerun 번호 지정 (세션별로 구분) ---
+_script_ctx = get_script_run_ctx()
+session_id = _script_ctx.session_id if _script_ctx else None
+perf.new_rerun(session_id)
+# 측정 켜기/끄기와 초기화는 프로세스 전체에 적용되므로 관리자만 사용합니다. (RECIPE_ADMIN_TOKEN + ?admin=<토큰>)
+is_admin = bool(os.getenv("RECIPE_ADMIN_TOKEN")) and st.query_params.get("admin") == os.getenv("RECIPE_ADMIN_TOKEN")
+
 # --- 리소스 로딩 (앱 실행 시 한 번만) ---
-model = load_bert_model()
-setup_database(model)
+# 임베딩 재생성(rebuild_embeddings.py)으로 모델이 바뀌면 캐시 키가 바뀌어 쿼리 인코딩 모델도 따라 바뀝니다.
+model_name = None if api_client else active_model_name()
+with perf.trace("load_bert_model"):
+    model = None if api_client else load_bert_model(model_name)
+with perf.trace("setup_database"):
+    setup_database(model)
+
+# RECIPE_SHARED_INDEX_DIR이 설정되어 있으면 여러 앱 프로세스가 게시된 메모리 맵 인덱스를 공유합니다.
+# 아직 게시된 세대가 없으면(기존 DB에 처음 설정한 경우) 첫 세대를 게시합니다.
+@st.cache_resource
+def load_shared_index(base_dir, model_name):
+    ensure_published(base_dir=base_dir)
+    return SharedIndexReader(base_dir, model_name=model_name)
+
+def current_shared_index():
+    try:
+        return load_shared_index(os.getenv("RECIPE_SHARED_INDEX_DIR"), model_name)
+    except Exception as e:
+        print(f"Warning: 공유 인덱스를 사용할 수 없어 스냅샷/DB 검색을 사용합니다: {e}")
+        return None
+
+shared_index = current_shared_index() if os.getenv("RECIPE_SHARED_INDEX_DIR") and not api_client else None
+
+# 그 외에는 DB 세대가 같은 동안 스냅샷(snapshot.py)을 메모리 맵으로 연결해두고 검색/영양성분 계산에 사용합니다.
+@st.cache_resource(max_entries=1)
+def load_search_snapshot(db_generation, model_name):
+    return load_or_build(model_name=model_name)
+
+def current_snapshot():
+    try:
+        return load_search_snapshot(current_db_generation(), model_name)
+    except Exception as e:
+        print(f"Warning: 검색 스냅샷을 사용할 수 없어 DB에서 직접 검색합니다: {e}")
+        return None
+
+snapshot = current_snapshot() if not api_client and not shared_index else None
+
+def fetch_similar_recipes(recipe_name: str, top_k: int = 6):
+    """상세 페이지의 '비슷한 레시피' 목록. (detail_loader 워커 스레드에서 실행되므로 st.*를 호출하지 않습니다)"""
+    if api_client:
+        return api_client.search_by_name(recipe_name, top_k=top_k)
+    if shared_index:
+        return search_by_name_index(recipe_name, model, shared_index.get(), top_k=top_k)
+    if snapshot:
+        return search_by_name_index(recipe_name, model, snapshot.index, top_k=top_k)
+    return search_by_name_bert(recipe_name, model, top_k=top_k)
 
 # --- 세션 상태 초기화 ---
 if 'selected_recipe_id' not in st.session_state:
@@ -79,7 +147,7 @@ if 'calc_ingredients' not in st.session_state:
 
 # --- UI 레이아웃 ---
 st.title("🍳 AI 레시피 추천 및 분석 서비스")
-tab1, tab2, tab3 = st.tabs(["🔍 AI 레시피 추천", "📈 트렌드 분석", "🧮 영양성분 계산기"])
+tab1, tab2, tab3, tab4 = st.tabs(["🔍 AI 레시피 추천", "📈 트렌드 분석", "🧮 영양성분 계산기", "⏱️ 성능 대시보드"])
 
 def save_dwell_log_if_needed():
     view_info = st.session_state.get('view_start_time')
@@ -113,8 +181,8 @@ with tab1:
         # [수정됨] '키워드명 (영상 검색)'을 기준으로 올바르게 분기 처리
         is_recipe_search = search_by_label != "영상 검색"
         
-        nation_df = db_query("SELECT NATION_CODE, NATION_NM FROM NATION_INFO ORDER BY NATION_CODE")
-        type_df = db_query("SELECT TY_CODE, TY_NM FROM TYPE_INFO ORDER BY TY_CODE")
+        nation_df = db_query(NATION_OPTIONS_SQL)
+        type_df = db_query(TYPE_OPTIONS_SQL)
         nation_options = {"전체": None, **pd.Series(nation_df.NATION_CODE.values, index=nation_df.NATION_NM).to_dict()}
         type_options = {"전체": None, **pd.Series(type_df.TY_CODE.values, index=type_df.TY_NM).to_dict()}
 
@@ -146,7 +214,18 @@ with tab1:
                 if is_recipe_search:
                     with st.spinner("AI가 레시피를 찾고 있습니다..."):
                         if search_by_label == "레시피명 (AI 추천)":
-                            results = search_by_name_bert(keyword, model, selected_nation_code, selected_type_code)
+                            if api_client:
+                                results = api_client.search_by_name(keyword, selected_nation_code, selected_type_code)
+                            elif shared_index:
+                                results = search_by_name_index(keyword, model, shared_index.get(), selected_nation_code, selected_type_code)
+                            elif snapshot:
+                                results = search_by_name_index(keyword, model, snapshot.index, selected_nation_code, selected_type_code)
+                            else:
+                                results = search_by_name_bert(keyword, model, selected_nation_code, selected_type_code)
+                        elif api_client:
+                            results = api_client.search_by_ingredient(keyword, selected_nation_code, selected_type_code)
+                        elif snapshot:
+                            results = snapshot.search_ingredient(keyword, selected_nation_code, selected_type_code)
                         else:
                             results = search_by_ingredient(keyword, selected_nation_code, selected_type_code)
                         st.session_state.search_results = results
@@ -182,11 +261,25 @@ with tab1:
                     st.rerun()
 
     with col2:
+        # 이전 rerun이 결과를 기다리다 중단되었다면(다른 레시피 클릭 등) 아직 시작하지 않은 작업을 취소합니다.
+        previous_load = st.session_state.pop('detail_load', None)
+        if previous_load is not None:
+            previous_load.cancel()
         if st.session_state.selected_recipe_id:
             st.subheader("상세 정보")
+            recipe_name = st.session_state.get('selected_recipe_name')
             try:
+                # 비슷한 레시피/영상을 먼저 워커에 맡기고, 상세 정보는 바로 조회하여 먼저 그립니다.
                 with st.spinner("레시피 상세 정보를 불러오는 중..."):
-                    details = fetch_recipe_detail(st.session_state.selected_recipe_id)
+                    load = start_detail_load(
+                        st.session_state.selected_recipe_id,
+                        api_client.fetch_recipe_detail if api_client else fetch_recipe_detail,
+                        None if st.session_state.get('similar_recipes_for') == st.session_state.selected_recipe_id else fetch_similar_recipes,
+                        None if st.session_state.youtube_videos else partial(search_youtube_videos, max_results=2),
+                        recipe_name=recipe_name,
+                    )
+                    st.session_state.detail_load = load
+                    details = load.result("detail")
                 if details:
                     base, ingredients, process = details['base'], details['ingredients'], details['process']
                     st.markdown(f"### 🍽️ {base['RECIPE_NM_KO']}")
@@ -210,14 +303,38 @@ with tab1:
                     st.subheader("👨‍🍳 조리 과정")
                     for i, step in enumerate(process, 1):
                         st.markdown(f"**{i}.** {step.get('COOKING_DC', '')}")
+
+                    # 비슷한 레시피는 레시피별로 한 번만 계산하고 다음 rerun부터는 세션에 저장된 값을 사용합니다.
+                    if "neighbours" in load:
+                        try:
+                            similar = load.result("neighbours")
+                        except Exception as e:
+                            print(f"Similar recipe lookup failed: {e}")
+                            similar = pd.DataFrame()
+                        if not similar.empty:
+                            similar = similar[similar['RECIPE_ID'] != st.session_state.selected_recipe_id].head(5)
+                        st.session_state.similar_recipes = similar
+                        st.session_state.similar_recipes_for = st.session_state.selected_recipe_id
+                    similar = st.session_state.get('similar_recipes', pd.DataFrame())
+                    if st.session_state.get('similar_recipes_for') == st.session_state.selected_recipe_id and not similar.empty:
+                        st.subheader("🔗 비슷한 레시피")
+                        for _, row in similar.iterrows():
+                            st.markdown(f"- {row['RECIPE_NM_KO']}")
                     
                     st.divider()
                     st.subheader("🎥 관련 유튜브 영상")
-                    st.session_state.youtube_query = base['RECIPE_NM_KO']
+                    st.session_state.youtube_query = recipe_name or base['RECIPE_NM_KO']
                     
                     if not st.session_state.youtube_videos:
                          with st.spinner("관련 영상을 찾는 중..."):
-                            videos, token = get_youtube_videos(st.session_state.youtube_query, max_results=2)
+                            if "videos" in load:
+                                try:
+                                    videos, token = load.result("videos")
+                                except YouTubeSearchError as e:
+                                    show_youtube_error(e)
+                                    videos, token = [], None
+                            else:
+                                videos, token = get_youtube_videos(st.session_state.youtube_query, max_results=2)
                             st.session_state.youtube_videos = videos
                             st.session_state.next_page_token = token
             except Exception as e:
@@ -244,15 +361,20 @@ with tab1:
 
 # --- 탭 2: 트렌드 분석 ---
 with tab2:
-    # (탭2 코드는 변경 없음)
     st.header("📈 트렌드 데이터 분석")
     st.info("사용자 행동 로그를 기반으로 한 심층 분석입니다.")
-    
+
+    # 전체 기간은 운영 DB + 일별 집계로 계산하고, 기간을 지정하면 해당 기간의 보관 로그만 읽어서 계산합니다.
+    period_days = {"전체": None, "최근 7일": 7, "최근 30일": 30, "최근 1년": 365}
+    period = st.radio("분석 기간", list(period_days), horizontal=True)
+    trend_start = None
+    if period_days[period] is not None:
+        trend_start = (datetime.now() - pd.Timedelta(days=period_days[period])).date()
+
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("인기 검색 키워드")
-        q1 = "SELECT SRCH_KEYWORD, COUNT(*) as count FROM SEARCH_LOG GROUP BY SRCH_KEYWORD ORDER BY count DESC LIMIT 10"
-        df1 = db_query(q1)
+        df1 = trend_top_keywords(trend_start)
         if not df1.empty:
             fig1 = px.bar(df1, x='SRCH_KEYWORD', y='count', title='TOP 10 검색 키워드', text_auto=True)
             st.plotly_chart(fig1, use_container_width=True)
@@ -261,14 +383,7 @@ with tab2:
 
     with col2:
         st.subheader("가장 많이 본 레시피")
-        q2 = """
-            SELECT r.RECIPE_NM_KO, COUNT(d.VIEW_ID) as view_count
-            FROM DWELL_TIME_LOG d
-            JOIN RECIPE_BASE r ON d.RECIPE_ID = r.RECIPE_ID
-            GROUP BY d.RECIPE_ID, r.RECIPE_NM_KO
-            ORDER BY view_count DESC LIMIT 10
-        """
-        df2 = db_query(q2)
+        df2 = trend_top_viewed(trend_start)
         if not df2.empty:
             fig2 = px.bar(df2, x='RECIPE_NM_KO', y='view_count', title='TOP 10 조회수 레시피', text_auto=True)
             st.plotly_chart(fig2, use_container_width=True)
@@ -278,16 +393,7 @@ with tab2:
     st.divider()
     st.subheader("검색어별 평균 레시피 체류시간")
     st.caption("단위: 초")
-    q3 = """
-        SELECT s.SRCH_KEYWORD, AVG(d.DWELL_TIME) as avg_dwell
-        FROM DWELL_TIME_LOG d
-        JOIN SEARCH_LOG s ON d.SRCH_ID = s.SRCH_ID
-        WHERE d.DWELL_TIME IS NOT NULL AND d.DWELL_TIME < 1800 -- 30분 이상은 이상치로 간주
-        GROUP BY s.SRCH_KEYWORD
-        HAVING COUNT(d.VIEW_ID) > 2 
-        ORDER BY avg_dwell DESC LIMIT 10
-    """
-    df3 = db_query(q3)
+    df3 = trend_keyword_dwell(trend_start)
     if not df3.empty:
         df3['avg_dwell'] = df3['avg_dwell'].round(1)
         fig3 = px.bar(df3, x='SRCH_KEYWORD', y='avg_dwell', title='검색어별 평균 체류시간 (초)', text_auto=True, labels={'avg_dwell': '평균 체류시간(초)'})
@@ -302,7 +408,7 @@ with tab3:
     st.info("재료와 무게(g)를 입력하면 총 영양성분을 계산해줍니다.")
 
     try:
-        all_ingredients = db_query("SELECT FOOD_NAME FROM NUTRITION_INFO ORDER BY FOOD_NAME")['FOOD_NAME'].tolist()
+        all_ingredients = db_query(NUTRITION_NAMES_SQL)['FOOD_NAME'].tolist()
     except Exception:
         all_ingredients = []
 
@@ -333,28 +439,13 @@ with tab3:
         st.divider()
 
         if st.button("영양성분 계산하기", type="primary"):
-            total_nutrition = {'ENERGY': 0.0, 'PROTEIN': 0.0, 'FAT': 0.0, 'CH': 0.0, 'SUGAR': 0.0}
-            
-            ingredient_list = [item['name'] for item in st.session_state.get('calc_ingredients', []) if item.get('name') and item.get('weight', 0) > 0]
-
-            if ingredient_list:
-                placeholders = ', '.join('?' for _ in ingredient_list)
-                query = f"SELECT * FROM NUTRITION_INFO WHERE FOOD_NAME IN ({placeholders})"
-                
-                with st.spinner("영양성분 정보를 조회하는 중..."):
-                    all_nut_info_df = db_query(query, ingredient_list)
-                
-                if not all_nut_info_df.empty:
-                    all_nut_info_df.set_index('FOOD_NAME', inplace=True)
-                    for item in st.session_state.get('calc_ingredients', []):
-                        if item.get('name') in all_nut_info_df.index and item.get('weight', 0) > 0:
-                            info = all_nut_info_df.loc[item['name']]
-                            ratio = item['weight'] / 100.0
-                            total_nutrition['ENERGY'] += info.get('ENERGY', 0) * ratio
-                            total_nutrition['PROTEIN'] += info.get('PROTEIN', 0) * ratio
-                            total_nutrition['FAT'] += info.get('FAT', 0) * ratio
-                            total_nutrition['CH'] += info.get('CH', 0) * ratio
-                            total_nutrition['SUGAR'] += info.get('SUGAR', 0) * ratio
+            with st.spinner("영양성분 정보를 조회하는 중..."):
+                if api_client:
+                    total_nutrition = api_client.calculate_nutrition(st.session_state.get('calc_ingredients', []))
+                elif snapshot:
+                    total_nutrition = snapshot.calculate_nutrition(st.session_state.get('calc_ingredients', []))
+                else:
+                    total_nutrition = calculate_nutrition(st.session_state.get('calc_ingredients', []))
             
             st.subheader("📈 총 영양성분")
             cols_nut = st.columns(5)
@@ -362,4 +453,52 @@ with tab3:
             cols_nut[1].metric("탄수화물", f"{total_nutrition['CH']:.1f} g")
             cols_nut[2].metric("단백질", f"{total_nutrition['PROTEIN']:.1f} g")
             cols_nut[3].metric("지방", f"{total_nutrition['FAT']:.1f} g")
-            cols_nut[4].metric("당류", f"{total_nutrition['SUGAR']:.1f} g")
\ No newline at end of file
+            cols_nut[4].metric("당류", f"{total_nutrition['SUGAR']:.1f} g")
+
+# --- 탭 4: 성능 대시보드 (관리자용) ---
+with tab4:
+    st.header("⏱️ 성능 대시보드")
+    st.info("DB 연결/쿼리, 임베딩 디코딩, 모델 인코딩, Firebase, YouTube API 호출 시간을 측정합니다.")
+
+    if is_admin:
+        trace_on = st.toggle("성능 측정 활성화", value=perf.ENABLED, help="모든 세션에 적용됩니다. 끄면 측정 오버헤드가 거의 없습니다.")
+        if trace_on != perf.ENABLED:
+            perf.enable(trace_on)
+            st.rerun()
+    else:
+        st.caption(f"성능 측정: {'켜짐' if perf.ENABLED else '꺼짐'} (설정 변경은 관리자만 가능합니다)")
+    st.caption(f"링 버퍼: 최근 {perf.BUFFER_SIZE}개 샘플 · 느린 작업 기준: {perf.SLOW_MS:.0f} ms 이상은 PERF_LOG에 저장")
+
+    perf_summary = pd.DataFrame(perf.summary())
+    if perf_summary.empty:
+        st.info("수집된 측정값이 없습니다. 측정을 활성화한 뒤 검색을 실행해보세요.")
+    else:
+        st.subheader("작업별 지연 시간 (ms)")
+        st.dataframe(perf_summary, use_container_width=True, hide_index=True)
+
+        selected_op = st.selectbox("히스토그램을 볼 작업", perf_summary['op'].tolist())
+        edges, counts = perf.histogram(selected_op)
+        if len(counts):
+            hist_df = pd.DataFrame({'구간(ms)': [f"{lo:.1f}~{hi:.1f}" for lo, hi in zip(edges[:-1], edges[1:])], 'count': counts})
+            fig_hist = px.bar(hist_df, x='구간(ms)', y='count', title=f"'{selected_op}' 지연 시간 분포")
+            st.plotly_chart(fig_hist, use_container_width=True)
+
+        rerun_df = pd.DataFrame(perf.rerun_breakdown(session_id=session_id))
+        if not rerun_df.empty:
+            fig_rerun = px.bar(rerun_df, x='rerun', y='total_ms', color='op', title='이 세션의 rerun별 작업 소요 시간 (ms)')
+            st.plotly_chart(fig_rerun, use_container_width=True)
+
+        if is_admin and st.button("측정값 초기화"):
+            perf.clear()
+            st.rerun()
+
+    st.divider()
+    st.subheader("느린 작업 기록 (PERF_LOG)")
+    perf.flush()
+    slow_df = db_query(SLOW_PERF_LOG_SQL)
+    if not slow_df.empty:
+        st.dataframe(slow_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("기록된 느린 작업이 없습니다.")
+
+perf.flush()
@@ -0,0 +1,270 @@
+"""
+검색/상세 조회/로그 저장 경로의 지연 시간과 처리량을 측정하는 벤치마크 스크립트입니다.
+
+Streamlit이나 실제 모델 없이 실행되며, 임시 SQLite DB에 합성 레시피 카탈로그를 만든 뒤
+여러 스레드에서 동시에 함수를 호출하여 p50/p95/p99 지연 시간과 QPS를 JSON으로 출력합니다.
+
+사용 예:
+    python benchmark.py --sizes 1000 10000 100000 --threads 1 4 8 --requests 200 --output bench.json
+    python benchmark.py --sizes 1000 --baseline bench.json   # 이전 결과와 p95 비교
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import db_schema
+import search_logic
+from migrations import migrate
+
+EMBEDDING_DIM = 384  # paraphrase-multilingual-MiniLM-L12-v2 와 같은 차원
+
+NATIONS = {3020001: "한식", 3020002: "중식", 3020003: "일식", 3020004: "양식", 3020005: "기타"}
+TYPES = {3010001 + i: nm for i, nm in enumerate(
+    ["밥", "국", "찌개", "구이", "볶음", "조림", "찜", "면", "전", "나물",
+     "샐러드", "빵", "떡", "디저트", "음료", "양념", "튀김", "무침", "죽", "그라탕", "피자"])}
+NAME_PREFIXES = ["매콤한", "달콤한", "간단", "든든한", "고소한", "담백한", "얼큰한", "새콤한", "바삭한", "부드러운"]
+NAME_MAINS = ["김치", "돼지고기", "닭가슴살", "두부", "소고기", "버섯", "감자", "고등어", "새우", "계란",
+              "애호박", "양배추", "오징어", "멸치", "연어", "시금치", "토마토", "브로콜리", "떡", "치즈"]
+NAME_DISHES = ["찌개", "볶음", "조림", "구이", "덮밥", "국", "전", "샐러드", "파스타", "무침", "찜", "죽"]
+INGREDIENTS = NAME_MAINS + ["양파", "대파", "마늘", "간장", "고추장", "설탕", "소금", "후추", "참기름",
+                            "식용유", "물", "고춧가루", "밀가루", "우유", "버터", "당근", "오이", "깨"]
+QUANTITIES = ["1큰술", "1/2컵", "200g", "1개", "약간", "2작은술", "1줌", "100ml", "3큰술", "1/4개"]
+
+
+class StubEncoder:
+    """문자열 해시로 시드를 정하는 결정적 인코더입니다. (모델 다운로드 없이 벤치마크용)"""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def encode(self, sentences, show_progress_bar: bool = False, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        return np.stack([self._vector(s) for s in sentences])
+
+
+class _SessionState(dict):
+    """log_dwell_time()에 넘기기 위해 st.session_state처럼 속성 접근을 지원하는 dict입니다."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def build_synthetic_db(db_path: str, n_recipes: int, encoder, seed: int = 42):
+    """합성 레시피 카탈로그로 채워진 SQLite DB를 생성합니다."""
+    rng = random.Random(seed)
+    names = [f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_MAINS)} {rng.choice(NAME_DISHES)}" for _ in range(n_recipes)]
+    # 같은 이름은 한 번만 인코딩합니다.
+    unique_names = sorted(set(names))
+    name_to_vec = dict(zip(unique_names, encoder.encode(unique_names)))
+
+    with sqlite3.connect(db_path) as conn:
+        db_schema.create_tables(conn)
+        conn.executemany("INSERT INTO NATION_INFO VALUES (?, ?)", NATIONS.items())
+        conn.executemany("INSERT INTO TYPE_INFO VALUES (?, ?)", TYPES.items())
+
+        nation_codes, type_codes = list(NATIONS), list(TYPES)
+        base_rows, ingr_rows, prc_rows = [], [], []
+        for recipe_id, name in enumerate(names, 1):
+            base_rows.append((
+                recipe_id, name, f"{name} 만드는 법", rng.choice(nation_codes), rng.choice(type_codes),
+                rng.choice([10, 20, 30, 60, 90]), rng.randint(0, 900), rng.randint(1, 4),
+                name_to_vec[name].tobytes(),
+            ))
+            for sn, ingr in enumerate(rng.sample(INGREDIENTS, rng.randint(5, 12)), 1):
+                ingr_rows.append((recipe_id, sn, ingr, rng.choice(QUANTITIES)))
+            for no in range(1, rng.randint(3, 8) + 1):
+                prc_rows.append((recipe_id, no, f"{no}번째 조리 과정입니다."))
+
+        conn.executemany("INSERT INTO RECIPE_BASE VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", base_rows)
+        conn.executemany("INSERT INTO RECIPE_INGREDIENT VALUES (?, ?, ?, ?)", ingr_rows)
+        conn.executemany("INSERT INTO RECIPE_PROCESS VALUES (?, ?, ?)", prc_rows)
+        conn.commit()
+        migrate(conn)
+    return names
+
+
+def _workloads(names, n_recipes, encoder, seed):
+    """(작업 이름, 호출 함수) 목록을 반환합니다. 각 호출 함수는 rng를 받아 한 번의 요청을 수행합니다."""
+    recommend_df = pd.DataFrame({"RECIPE_ID": range(1, 16)})
+
+    def name_search(rng):
+        nation = rng.choice([None, *NATIONS])
+        search_logic.search_by_name_bert(rng.choice(names), encoder, nation_code=nation)
+
+    def ingredient_search(rng):
+        nation = rng.choice([None, *NATIONS])
+        search_logic.search_by_ingredient(rng.choice(INGREDIENTS), nation_code=nation)
+
+    def detail(rng):
+        search_logic.fetch_recipe_detail(rng.randint(1, n_recipes))
+
+    def log_search(rng):
+        search_logic.log_search(rng.choice([1, 2, 3]), rng.choice(names), rng.choice([None, *NATIONS]))
+
+    def log_recommendations(rng):
+        search_logic.log_recommendations(rng.randint(1, 1000), recommend_df)
+
+    def log_dwell(rng):
+        session = _SessionState(view_start_time={
+            "srch_id": rng.randint(1, 1000), "recipe_id": rng.randint(1, n_recipes),
+            "time": datetime.now() - timedelta(seconds=rng.randint(4, 300)),
+        })
+        search_logic.log_dwell_time(session)
+
+    return [
+        ("search_by_name_bert", name_search),
+        ("search_by_ingredient", ingredient_search),
+        ("fetch_recipe_detail", detail),
+        ("log_search", log_search),
+        ("log_recommendations", log_recommendations),
+        ("log_dwell_time", log_dwell),
+    ]
+
+
+def run_workload(call, n_threads: int, n_requests: int, seed: int = 0):
+    """call을 n_threads개 스레드에서 총 n_requests번 실행하고 지연 시간 통계를 반환합니다."""
+    def one(i):
+        rng = random.Random(seed * 1_000_003 + i)
+        start = time.perf_counter()
+        try:
+            call(rng)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, repr(e)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        outcomes = list(executor.map(one, range(n_requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies_ms = np.array([o[0] for o in outcomes if o[1] is None]) * 1000
+    errors = [o[1] for o in outcomes if o[1] is not None]
+    stats = {
+        "threads": n_threads,
+        "requests": n_requests,
+        "errors": len(errors),
+        "wall_s": round(wall, 4),
+        "qps": round((n_requests - len(errors)) / wall, 2) if wall > 0 else None,
+    }
+    if latencies_ms.size:
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        stats.update({
+            "p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3),
+            "mean_ms": round(float(latencies_ms.mean()), 3), "max_ms": round(float(latencies_ms.max()), 3),
+        })
+    if errors:
+        stats["first_error"] = errors[0]
+    return stats
+
+
+def run_benchmark(sizes, thread_counts, n_requests, operations=None, seed=42, keep_dir=None):
+    """카탈로그 크기별로 DB를 만들고 모든 작업을 측정하여 결과 dict를 반환합니다."""
+    encoder = StubEncoder()
+    results = []
+    original_db = db_schema.DB_FILE
+    tmp = None if keep_dir else tempfile.TemporaryDirectory(prefix="recipe_bench_")
+    work_dir = keep_dir or tmp.name
+    try:
+        for size in sizes:
+            db_path = os.path.join(work_dir, f"bench_{size}.db")
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            build_start = time.perf_counter()
+            names = build_synthetic_db(db_path, size, encoder, seed)
+            build_s = time.perf_counter() - build_start
+            print(f"[bench] {size} recipes built in {build_s:.1f}s -> {db_path}", file=sys.stderr)
+
+            db_schema.DB_FILE = db_path
+            for op, call in _workloads(names, size, encoder, seed):
+                if operations and op not in operations:
+                    continue
+                for n_threads in thread_counts:
+                    stats = run_workload(call, n_threads, n_requests, seed)
+                    print(f"[bench] size={size} op={op} threads={n_threads} "
+                          f"p95={stats.get('p95_ms')}ms qps={stats['qps']}", file=sys.stderr)
+                    results.append({"size": size, "op": op, **stats})
+    finally:
+        db_schema.DB_FILE = original_db
+        if tmp:
+            tmp.cleanup()
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sqlite": sqlite3.sqlite_version,
+            "encoder": "StubEncoder",
+            "embedding_dim": EMBEDDING_DIM,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(current, baseline, threshold=1.2):
+    """같은 (size, op, threads) 조합의 p95를 비교하여 threshold배 이상 느려진 항목을 반환합니다."""
+    key = lambda r: (r["size"], r["op"], r["threads"])
+    base = {key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        b = base.get(key(r))
+        if not b or not b.get("p95_ms") or not r.get("p95_ms"):
+            continue
+        ratio = r["p95_ms"] / b["p95_ms"]
+        if ratio >= threshold:
+            regressions.append({"size": r["size"], "op": r["op"], "threads": r["threads"],
+                                "baseline_p95_ms": b["p95_ms"], "p95_ms": r["p95_ms"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="레시피 검색/상세/로그 경로 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="합성 카탈로그 레시피 수")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8], help="동시 실행 스레드 수")
+    parser.add_argument("--requests", type=int, default=200, help="작업/스레드 조합당 총 요청 수")
+    parser.add_argument("--ops", nargs="+", default=None, help="측정할 작업 이름 (기본: 전체)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-dir", default=None, help="생성한 DB를 남겨둘 디렉터리")
+    parser.add_argument("--output", default=None, help="결과 JSON 파일 경로 (기본: stdout)")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--threshold", type=float, default=1.2, help="회귀로 판단할 p95 배율")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, args.threads, args.requests, args.ops, args.seed, args.keep_dir)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare_to_baseline(report, json.load(f), args.threshold)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
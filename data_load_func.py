@@ -1,11 +1,13 @@
 import pandas as pd
 import requests
 
-def fetch_all_data(fetch_function, total, step=1000):
+def iter_pages(fetch_function, total, step=1000, raise_errors=False):
     """
-    주어진 fetch 함수를 여러 번 호출하여 전체 데이터를 가져오는 헬퍼 함수입니다.
+    주어진 fetch 함수를 step 단위로 호출하며 페이지(DataFrame)를 하나씩 반환하는 제너레이터입니다.
+    전체 데이터를 메모리에 모으지 않고 페이지 단위로 처리할 때 사용합니다.
+    raise_errors=False이면 오류가 난 페이지에서 멈추고, True이면 예외를 그대로 다시 발생시킵니다.
+    (일부만 받아 놓고 완료로 표시하면 안 되는 적재 경로에서 사용)
     """
-    dfs = []
     for start in range(1, total + 1, step):
         end = start + step - 1
         if end > total:
@@ -13,10 +15,18 @@ def fetch_all_data(fetch_function, total, step=1000):
         try:
             print(f"Fetching data from {start} to {end}...")
             df = fetch_function(start, end)
-            dfs.append(df)
         except Exception as e:
             print(f"Error fetching data from {start} to {end}: {e}")
+            if raise_errors:
+                raise
             break
+        yield df
+
+def fetch_all_data(fetch_function, total, step=1000):
+    """
+    주어진 fetch 함수를 여러 번 호출하여 전체 데이터를 가져오는 헬퍼 함수입니다.
+    """
+    dfs = list(iter_pages(fetch_function, total, step))
     if not dfs:
         return pd.DataFrame()
     return pd.concat(dfs, ignore_index=True)
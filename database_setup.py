@@ -11,24 +11,14 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import make_pipeline
 from sklearn.metrics import r2_score
 
-# 실제 프로젝트에서는 data_load_func.py에서 이 함수들을 가져옵니다.
-from data_load_func import fetch_basic_list, fetch_ingr_list, fetch_prc_list, fetch_all_data
-
-DB_FILE = os.path.join("data", "recipe_app.db")
-os.makedirs("data", exist_ok=True)
+from db_schema import DB_FILE, get_meta, bump_catalogue_version
+from migrations import migrate
+from log_retention import maybe_run_retention, RUN_INTERVAL_HOURS
+from quantity import quantities_to_grams
+from ingest import ingest_catalogue, ingest_nutrition_csv, CATALOGUE_STATE_KEY
 
 
 # --- 칼로리 예측을 위한 헬퍼 함수들 ---
-def clean_and_evaluate(expr: str):
-    if pd.isna(expr): return np.nan
-    expr = str(expr).replace(' ', '').replace('과', '+').replace('와', '+')
-    expr = re.sub(r'[^0-9\+\-\*/\.]', '', expr)
-    if not expr: return np.nan
-    try:
-        return round(eval(expr), 3)
-    except:
-        return np.nan
-
 def clean_ingredient_name(name: str) -> str:
     if pd.isna(name): return ""
     name = re.sub(r'\([^)]*\)', '', str(name)).strip()
@@ -43,8 +33,9 @@ def predict_and_update_calories(conn):
     df_recipe = pd.read_sql("SELECT RECIPE_ID, CALORIE FROM RECIPE_BASE", conn)
     df_ingr = pd.read_sql("SELECT RECIPE_ID, IRDNT_NM, IRDNT_CPCTY FROM RECIPE_INGREDIENT", conn)
 
-    df_ingr["IRDNT_CPCTY"] = df_ingr["IRDNT_CPCTY"].apply(clean_and_evaluate).fillna(0)
     df_ingr["IRDNT_NM"] = df_ingr["IRDNT_NM"].apply(clean_ingredient_name)
+    # 분량 문자열("1/2컵", "3큰술", "200g" 등)을 단위까지 해석하여 그램으로 환산합니다.
+    df_ingr["IRDNT_CPCTY"] = quantities_to_grams(df_ingr["IRDNT_NM"], df_ingr["IRDNT_CPCTY"]).fillna(0).round(1)
     df_ingr['IRDNT_FULL'] = df_ingr['IRDNT_NM'].astype(str) + ' ' + df_ingr['IRDNT_CPCTY'].astype(str)
     
     df_ingr_grouped = df_ingr.groupby("RECIPE_ID")['IRDNT_FULL'].apply(lambda x: ', '.join(x)).reset_index()
@@ -90,145 +81,66 @@ def predict_and_update_calories(conn):
     st.toast(f"✅ AI가 {len(update_data)}개 레시피의 칼로리를 예측하여 저장했습니다.", icon="🤖")
 
 # --- 메인 DB 설정 함수 ---
+@st.cache_resource(ttl=RUN_INTERVAL_HOURS * 3600)
+def prepare_database(db_file: str) -> int:
+    """
+    테이블 생성 + 버전 관리 마이그레이션(제약조건 복원, 인덱스)을 적용하고 오래된 사용자 로그를 보관합니다.
+    Streamlit 재실행마다가 아니라 프로세스당 한 번(이후 하루 한 번) 실행되며, 스키마 버전을 반환합니다.
+    """
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON;")
+        version = migrate(conn)
+        # 보관 기간이 지난 사용자 로그를 Parquet으로 옮기고 일별 집계에 누적합니다. (하루 한 번)
+        maybe_run_retention(conn)
+        return version
+    finally:
+        conn.close()
+
 def setup_database(model):
     conn = None
     try:
+        prepare_database(DB_FILE)
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
         cursor.execute("PRAGMA foreign_keys = ON;")
-        
-        cursor.executescript("""
-            CREATE TABLE IF NOT EXISTS NATION_INFO (
-                NATION_CODE INTEGER PRIMARY KEY,
-                NATION_NM VARCHAR
-            );
-            CREATE TABLE IF NOT EXISTS TYPE_INFO (
-                TY_CODE INTEGER PRIMARY KEY,
-                TY_NM VARCHAR
-            );
-            CREATE TABLE IF NOT EXISTS RECIPE_BASE (
-                RECIPE_ID INTEGER PRIMARY KEY,
-                RECIPE_NM_KO VARCHAR,
-                SUMRY VARCHAR,
-                NATION_CODE INTEGER,
-                TY_CODE INTEGER,
-                COOKING_TIME INTEGER,
-                CALORIE INTEGER,
-                QNT INTEGER,
-                EMBEDDING BLOB,
-                FOREIGN KEY (NATION_CODE) REFERENCES NATION_INFO(NATION_CODE),
-                FOREIGN KEY (TY_CODE) REFERENCES TYPE_INFO(TY_CODE)
-            );
-            CREATE TABLE IF NOT EXISTS RECIPE_INGREDIENT (
-                RECIPE_ID INTEGER,
-                IRDNT_SN INTEGER,
-                IRDNT_NM VARCHAR,
-                IRDNT_CPCTY VARCHAR,
-                PRIMARY KEY (RECIPE_ID, IRDNT_SN),
-                FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
-            );
-            CREATE TABLE IF NOT EXISTS RECIPE_PROCESS (
-                RECIPE_ID INTEGER,
-                COOKING_NO INTEGER,
-                COOKING_DC TEXT,
-                PRIMARY KEY (RECIPE_ID, COOKING_NO),
-                FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
-            );
-            CREATE TABLE IF NOT EXISTS NUTRITION_INFO (
-                FOOD_GROUP VARCHAR,
-                FOOD_NAME VARCHAR PRIMARY KEY,
-                ENERGY INTEGER,
-                PROTEIN FLOAT,
-                FAT FLOAT,
-                CH FLOAT,
-                SUGAR FLOAT
-            );
-            CREATE TABLE IF NOT EXISTS SEARCH_LOG (
-                SRCH_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                SRCH_CODE INTEGER,
-                SRCH_KEYWORD VARCHAR,
-                NATION_CODE INTEGER,
-                SRCH_TIME DATETIME
-            );
-            CREATE TABLE IF NOT EXISTS RECOMMEND_LOG (
-                REC_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                SRCH_ID INTEGER,
-                RECIPE_ID INTEGER,
-                FOREIGN KEY (SRCH_ID) REFERENCES SEARCH_LOG(SRCH_ID),
-                FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
-            );
-            CREATE TABLE IF NOT EXISTS DWELL_TIME_LOG (
-                VIEW_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                SRCH_ID INTEGER,
-                RECIPE_ID INTEGER,
-                START_TIME DATETIME,
-                DWELL_TIME INTEGER,
-                FOREIGN KEY (SRCH_ID) REFERENCES SEARCH_LOG(SRCH_ID),
-                FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
-            );
-        """)
-        conn.commit()
 
         is_recipe_empty = cursor.execute("SELECT COUNT(*) FROM RECIPE_BASE").fetchone()[0] == 0
-        if is_recipe_empty:
+        # 이전 적재가 중간에 중단되었다면('running') 이어서 다시 적재합니다.
+        needs_ingest = is_recipe_empty or get_meta(conn, CATALOGUE_STATE_KEY) == "running"
+        if needs_ingest and model is None:
+            # API 클라이언트 모드에서는 모델을 로드하지 않으므로 카탈로그 구축은 서버 쪽에서 수행해야 합니다.
+            st.error("레시피 DB가 비어 있습니다. API 서버 측에서 먼저 DB를 구축해주세요.")
+        elif needs_ingest:
             with st.spinner('최초 실행: DB 설정 및 AI 모델링 중... (약 3-5분 소요)'):
                 try:
-                    # 1. API 데이터 로드 및 저장
-                    df_basic_raw = fetch_all_data(fetch_basic_list, total=1000, step=100)
-                    df_ingr_raw = fetch_all_data(fetch_ingr_list, total=6200, step=100)
-                    df_prc_raw = fetch_all_data(fetch_prc_list,  total=3100, step=100)
-                    
-                    df_basic = df_basic_raw.copy()
-                    df_ingr = df_ingr_raw.copy()
-                    
-                    df_basic['NATION_NM'] = df_basic['NATION_NM'].replace({'일본':'일식', '중국':'중식', '이탈리아':'양식', '서양':'양식', '동남아시아':'기타', '퓨전':'기타'})
-                    df_basic['NATION_CODE'] = df_basic['NATION_CODE'].replace({'3020009':'3020005', '3020006':'3020002'})
-                    for col in ['CALORIE', 'COOKING_TIME', 'QNT']:
-                        df_basic[col] = pd.to_numeric(df_basic[col].str.replace(r'[^\d.]', '', regex=True), errors='coerce').fillna(0).astype(int)
-                    df_ingr.loc[:, 'IRDNT_SN'] = df_ingr.groupby('RECIPE_ID').cumcount() + 1
-
-                    RECIPE_BASE_df = df_basic[['RECIPE_ID', 'RECIPE_NM_KO', 'SUMRY', 'NATION_CODE', 'TY_CODE', 'COOKING_TIME', 'CALORIE', 'QNT']].copy()
-                    recipe_names = RECIPE_BASE_df["RECIPE_NM_KO"].fillna("").tolist()
-                    embeddings = model.encode(recipe_names, show_progress_bar=True)
-                    RECIPE_BASE_df.loc[:, 'EMBEDDING'] = [e.tobytes() for e in embeddings]
-
-                    NATION_INFO_df = df_basic[['NATION_CODE', 'NATION_NM']].drop_duplicates().sort_values(by='NATION_CODE').reset_index(drop=True)
-                    TYPE_INFO_df = df_basic[['TY_CODE', 'TY_NM']].drop_duplicates().sort_values(by='TY_CODE').reset_index(drop=True)
-                    RECIPE_INGREDIENT_df = df_ingr[['RECIPE_ID', 'IRDNT_SN', 'IRDNT_NM', 'IRDNT_CPCTY']]
-                    RECIPE_PROCESS_df = df_prc_raw[['RECIPE_ID', 'COOKING_NO', 'COOKING_DC']]
-
-                    NATION_INFO_df.to_sql('NATION_INFO', conn, if_exists='replace', index=False)
-                    TYPE_INFO_df.to_sql('TYPE_INFO', conn, if_exists='replace', index=False)
-                    RECIPE_BASE_df.to_sql('RECIPE_BASE', conn, if_exists='replace', index=False)
-                    RECIPE_INGREDIENT_df.to_sql('RECIPE_INGREDIENT', conn, if_exists='replace', index=False)
-                    RECIPE_PROCESS_df.to_sql('RECIPE_PROCESS', conn, if_exists='replace', index=False)
-                    
-                    st.toast("✅ API 레시피 및 AI 임베딩 저장 완료!", icon="🚀")
+                    # 1. API 데이터를 페이지 단위로 정규화/임베딩하여 저장 (페이지마다 커밋)
+                    counts = ingest_catalogue(conn, model, basic_total=1000, ingr_total=6200, prc_total=3100, step=100)
+                    st.toast(f"✅ API 레시피 {counts.get('RECIPE_BASE', 0)}개 및 AI 임베딩 저장 완료!", icon="🚀")
 
                     # 2. 누락된 칼로리 예측 및 업데이트
                     predict_and_update_calories(conn)
+                    bump_catalogue_version(conn)
+                    conn.commit()
 
-                    # 3. 영양 정보 로드 및 저장
+                    # 3. 영양 정보를 청크 단위로 저장
                     is_nutrition_empty = cursor.execute("SELECT COUNT(*) FROM NUTRITION_INFO").fetchone()[0] == 0
                     if is_nutrition_empty:
-                        NUTRITION_FILE_PATH = './data/nutrition_info.csv'
+                        NUTRITION_FILE_PATH = './data/nutrition_info.CSV'
                         if os.path.exists(NUTRITION_FILE_PATH):
-                            df_nutrition_raw = pd.read_csv(NUTRITION_FILE_PATH, encoding='utf-8-sig', skiprows=[1])
-                            df_nutrition_raw.columns = df_nutrition_raw.columns.str.strip()
-                            df_nutrition = df_nutrition_raw[['식품군', '식품명', '에너지', '탄수화물', '단백질', '지방', '당류']].rename(columns={'식품군':'FOOD_GROUP', '식품명':'FOOD_NAME', '에너지':'ENERGY', '탄수화물':'CH', '단백질':'PROTEIN', '지방':'FAT', '당류':'SUGAR'})
-                            for col in df_nutrition.columns.drop(['FOOD_GROUP', 'FOOD_NAME']):
-                                df_nutrition[col] = pd.to_numeric(df_nutrition[col], errors='coerce').fillna(0)
-                            df_nutrition.to_sql('NUTRITION_INFO', conn, if_exists='replace', index=False)
-                            st.toast(f"✅ CSV 영양 정보 {len(df_nutrition)}개 저장 완료!", icon="📊")
+                            n_nutrition = ingest_nutrition_csv(conn, NUTRITION_FILE_PATH)
+                            st.toast(f"✅ CSV 영양 정보 {n_nutrition}개 저장 완료!", icon="📊")
                         else:
                             st.warning(f"'{NUTRITION_FILE_PATH}' 파일을 찾을 수 없습니다.")
 
-                    # 4. 모든 작업이 성공하면 최종 커밋
-                    conn.commit()
+                    # 4. 공유 인덱스 모드라면 새 세대를 게시하여 워커 프로세스들이 전환하도록 합니다.
+                    if os.getenv("RECIPE_SHARED_INDEX_DIR"):
+                        from shared_index import publish_from_db
+                        publish_from_db(DB_FILE, os.getenv("RECIPE_SHARED_INDEX_DIR"))
 
                 except Exception as e:
                     if conn: conn.rollback()
-                    st.error(f"초기 데이터 구축 중 오류 발생. DB 변경사항이 롤백되었습니다: {e}")
+                    st.error(f"초기 데이터 구축 중 오류 발생. 완료된 페이지까지는 저장되었으며, 다음 실행 시 이어서 적재합니다: {e}")
                     import traceback
                     traceback.print_exc()
     
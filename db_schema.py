@@ -0,0 +1,187 @@
+import os
+import sqlite3
+
+# DB 경로는 환경 변수로 덮어쓸 수 있습니다. (벤치마크/API 서버 등 Streamlit 밖에서 사용)
+DB_FILE = os.getenv("RECIPE_DB_FILE", os.path.join("data", "recipe_app.db"))
+os.makedirs(os.path.dirname(DB_FILE) or ".", exist_ok=True)
+
+# 테이블 이름 -> 선언된 DDL. 마이그레이션(migrations.py)에서 제약조건 복원에도 사용합니다.
+TABLE_DDL = {
+    "NATION_INFO": """
+        CREATE TABLE IF NOT EXISTS NATION_INFO (
+            NATION_CODE INTEGER PRIMARY KEY,
+            NATION_NM VARCHAR
+        )
+    """,
+    "TYPE_INFO": """
+        CREATE TABLE IF NOT EXISTS TYPE_INFO (
+            TY_CODE INTEGER PRIMARY KEY,
+            TY_NM VARCHAR
+        )
+    """,
+    "RECIPE_BASE": """
+        CREATE TABLE IF NOT EXISTS RECIPE_BASE (
+            RECIPE_ID INTEGER PRIMARY KEY,
+            RECIPE_NM_KO VARCHAR,
+            SUMRY VARCHAR,
+            NATION_CODE INTEGER,
+            TY_CODE INTEGER,
+            COOKING_TIME INTEGER,
+            CALORIE INTEGER,
+            QNT INTEGER,
+            EMBEDDING BLOB,
+            FOREIGN KEY (NATION_CODE) REFERENCES NATION_INFO(NATION_CODE),
+            FOREIGN KEY (TY_CODE) REFERENCES TYPE_INFO(TY_CODE)
+        )
+    """,
+    "RECIPE_INGREDIENT": """
+        CREATE TABLE IF NOT EXISTS RECIPE_INGREDIENT (
+            RECIPE_ID INTEGER,
+            IRDNT_SN INTEGER,
+            IRDNT_NM VARCHAR,
+            IRDNT_CPCTY VARCHAR,
+            PRIMARY KEY (RECIPE_ID, IRDNT_SN),
+            FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
+        )
+    """,
+    "RECIPE_PROCESS": """
+        CREATE TABLE IF NOT EXISTS RECIPE_PROCESS (
+            RECIPE_ID INTEGER,
+            COOKING_NO INTEGER,
+            COOKING_DC TEXT,
+            PRIMARY KEY (RECIPE_ID, COOKING_NO),
+            FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
+        )
+    """,
+    "NUTRITION_INFO": """
+        CREATE TABLE IF NOT EXISTS NUTRITION_INFO (
+            FOOD_GROUP VARCHAR,
+            FOOD_NAME VARCHAR PRIMARY KEY,
+            ENERGY INTEGER,
+            PROTEIN FLOAT,
+            FAT FLOAT,
+            CH FLOAT,
+            SUGAR FLOAT
+        )
+    """,
+    "SEARCH_LOG": """
+        CREATE TABLE IF NOT EXISTS SEARCH_LOG (
+            SRCH_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            SRCH_CODE INTEGER,
+            SRCH_KEYWORD VARCHAR,
+            NATION_CODE INTEGER,
+            SRCH_TIME DATETIME
+        )
+    """,
+    "RECOMMEND_LOG": """
+        CREATE TABLE IF NOT EXISTS RECOMMEND_LOG (
+            REC_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            SRCH_ID INTEGER,
+            RECIPE_ID INTEGER,
+            FOREIGN KEY (SRCH_ID) REFERENCES SEARCH_LOG(SRCH_ID),
+            FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
+        )
+    """,
+    "DWELL_TIME_LOG": """
+        CREATE TABLE IF NOT EXISTS DWELL_TIME_LOG (
+            VIEW_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            SRCH_ID INTEGER,
+            RECIPE_ID INTEGER,
+            START_TIME DATETIME,
+            DWELL_TIME INTEGER,
+            FOREIGN KEY (SRCH_ID) REFERENCES SEARCH_LOG(SRCH_ID),
+            FOREIGN KEY (RECIPE_ID) REFERENCES RECIPE_BASE(RECIPE_ID)
+        )
+    """,
+    # 보관(아카이브)된 로그의 일별 집계. 트렌드 탭의 전체 기간 조회에 사용합니다. (log_retention.py)
+    "SEARCH_KEYWORD_DAILY": """
+        CREATE TABLE IF NOT EXISTS SEARCH_KEYWORD_DAILY (
+            STAT_DATE VARCHAR,
+            SRCH_KEYWORD VARCHAR,
+            SRCH_COUNT INTEGER,
+            PRIMARY KEY (STAT_DATE, SRCH_KEYWORD)
+        )
+    """,
+    "RECIPE_VIEW_DAILY": """
+        CREATE TABLE IF NOT EXISTS RECIPE_VIEW_DAILY (
+            STAT_DATE VARCHAR,
+            RECIPE_ID INTEGER,
+            VIEW_COUNT INTEGER,
+            PRIMARY KEY (STAT_DATE, RECIPE_ID)
+        )
+    """,
+    "KEYWORD_DWELL_DAILY": """
+        CREATE TABLE IF NOT EXISTS KEYWORD_DWELL_DAILY (
+            STAT_DATE VARCHAR,
+            SRCH_KEYWORD VARCHAR,
+            DWELL_SUM INTEGER,
+            DWELL_COUNT INTEGER,
+            PRIMARY KEY (STAT_DATE, SRCH_KEYWORD)
+        )
+    """,
+    # 임베딩 재생성 세대. 완성된 세대만 RECIPE_BASE.EMBEDDING으로 전환합니다. (rebuild_embeddings.py)
+    "EMBEDDING_GENERATION": """
+        CREATE TABLE IF NOT EXISTS EMBEDDING_GENERATION (
+            GENERATION INTEGER PRIMARY KEY,
+            MODEL_NAME VARCHAR,
+            STATUS VARCHAR,
+            CREATED_AT DATETIME,
+            ACTIVATED_AT DATETIME
+        )
+    """,
+    "RECIPE_EMBEDDING": """
+        CREATE TABLE IF NOT EXISTS RECIPE_EMBEDDING (
+            GENERATION INTEGER,
+            RECIPE_ID INTEGER,
+            EMBEDDING BLOB,
+            PRIMARY KEY (GENERATION, RECIPE_ID),
+            FOREIGN KEY (GENERATION) REFERENCES EMBEDDING_GENERATION(GENERATION)
+        )
+    """,
+    "APP_META": """
+        CREATE TABLE IF NOT EXISTS APP_META (
+            META_KEY VARCHAR PRIMARY KEY,
+            META_VALUE VARCHAR
+        )
+    """,
+    "PERF_LOG": """
+        CREATE TABLE IF NOT EXISTS PERF_LOG (
+            PERF_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            LOG_TIME DATETIME,
+            RERUN_ID INTEGER,
+            OP_NM VARCHAR,
+            ELAPSED_MS FLOAT
+        )
+    """,
+}
+
+SCHEMA_SQL = ";\n".join(TABLE_DDL.values())
+
+def create_tables(conn: sqlite3.Connection):
+    """서비스에서 사용하는 모든 테이블을 (없을 경우) 생성합니다."""
+    conn.executescript(SCHEMA_SQL)
+    conn.commit()
+
+def get_meta(conn: sqlite3.Connection, key: str, default=None):
+    """APP_META 테이블에서 key에 해당하는 값을 읽습니다."""
+    row = conn.execute("SELECT META_VALUE FROM APP_META WHERE META_KEY = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(conn: sqlite3.Connection, key: str, value):
+    """APP_META 테이블에 key/value를 저장합니다. (커밋은 호출한 쪽에서 합니다)"""
+    conn.execute(
+        "INSERT INTO APP_META (META_KEY, META_VALUE) VALUES (?, ?) "
+        "ON CONFLICT (META_KEY) DO UPDATE SET META_VALUE = excluded.META_VALUE",
+        (key, None if value is None else str(value)),
+    )
+
+CATALOGUE_VERSION_KEY = "catalogue_version"
+
+def bump_catalogue_version(conn: sqlite3.Connection) -> int:
+    """
+    카탈로그(레시피/재료/영양 정보/임베딩)가 바뀌었음을 표시하고 새 버전을 반환합니다. (커밋은 호출한 쪽에서 합니다)
+    snapshot.py는 이 버전으로 저장된 스냅샷이 현재 DB와 맞는지 판단합니다.
+    """
+    version = int(get_meta(conn, CATALOGUE_VERSION_KEY, 0)) + 1
+    set_meta(conn, CATALOGUE_VERSION_KEY, version)
+    return version
@@ -0,0 +1,92 @@
+"""
+레시피 상세 페이지에 필요한 데이터(상세 정보, 비슷한 레시피, 유튜브 영상)를 동시에 불러오는 모듈입니다.
+
+레시피를 선택하면 비슷한 레시피/영상 작업을 워커 스레드 풀에 먼저 제출하고, 상세 정보는 화면을 그리는
+스레드에서 바로 조회합니다. 전체 대기 시간은 각 작업 지연 시간의 합이 아니라 가장 느린 작업의 지연 시간이 되며,
+임계 경로인 상세 정보 조회는 다른 세션의 네트워크 호출 뒤에 줄 서지 않습니다.
+화면은 상세 정보부터 그리고, 영상은 나중에 채웁니다.
+
+perf에는 단계별로 다음 값이 기록됩니다. (성능 대시보드 탭에서 확인)
+- detail.load.<단계>  : 작업 자체에 걸린 시간 (상세 정보는 화면을 그리는 스레드, 나머지는 워커)
+- detail.wait.<단계>  : 화면을 그리는 스레드가 결과를 기다리며 막혀 있던 시간 (상세 정보는 바로 조회하므로 0에 가까움)
+- detail.total        : 로드 시작부터 마지막 결과를 받을 때까지의 시간
+
+워커 스레드에는 Streamlit 실행 컨텍스트가 없으므로 제출하는 함수는 st.*를 호출하면 안 됩니다.
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import perf
+
+STAGES = ("detail", "neighbours", "videos")
+
+# 모든 세션이 공유하는 I/O 대기 위주의 풀입니다. (세션당 동시에 최대 2개 작업: 비슷한 레시피, 영상)
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="detail-loader")
+
+
+def _run_stage(stage: str, func, *args):
+    with perf.trace(f"detail.load.{stage}"):
+        return func(*args)
+
+
+def _run_stage_for(rerun, stage: str, func, *args):
+    """워커 스레드에서 제출한 rerun의 측정값으로 기록되도록 실행합니다."""
+    with perf.rerun_context(rerun):
+        return _run_stage(stage, func, *args)
+
+
+class DetailLoad:
+    """진행 중인 상세 페이지 로드입니다. result()로 단계별 결과를 기다립니다."""
+
+    def __init__(self, futures: dict, started: float = None):
+        self._futures = futures
+        self._started = started if started is not None else time.perf_counter()
+        self._pending = set(futures)
+
+    def __contains__(self, stage: str) -> bool:
+        return stage in self._futures
+
+    def result(self, stage: str, timeout: float = None):
+        """stage 결과를 기다려 반환합니다. 작업에서 발생한 예외는 그대로 다시 발생합니다."""
+        future = self._futures[stage]
+        waited = time.perf_counter()
+        try:
+            return future.result(timeout)
+        finally:
+            if perf.ENABLED:
+                now = time.perf_counter()
+                perf.record(f"detail.wait.{stage}", (now - waited) * 1000)
+                self._pending.discard(stage)
+                if not self._pending:
+                    perf.record("detail.total", (now - self._started) * 1000)
+
+    def cancel(self):
+        """아직 시작하지 않은 작업을 취소합니다. (결과를 기다리던 rerun이 중단되고 새 rerun이 시작된 경우)"""
+        for future in self._futures.values():
+            future.cancel()
+
+
+def _run_inline(stage: str, func, *args) -> Future:
+    """호출한 스레드에서 바로 실행하고 결과(또는 예외)를 완료된 Future로 감쌉니다."""
+    future = Future()
+    try:
+        future.set_result(_run_stage(stage, func, *args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def start_detail_load(recipe_id, fetch_detail, fetch_neighbours=None, fetch_videos=None, recipe_name: str = None) -> DetailLoad:
+    """
+    비슷한 레시피(fetch_neighbours(recipe_name))와 영상(fetch_videos(recipe_name))을 워커 풀에 제출한 뒤,
+    상세 정보(fetch_detail(recipe_id))는 호출한 스레드에서 조회합니다. 이름이 없거나 함수가 None인 단계는 건너뜁니다.
+    """
+    futures = {}
+    started = time.perf_counter()
+    rerun = perf.current_rerun()
+    if recipe_name and fetch_neighbours is not None:
+        futures["neighbours"] = _executor.submit(_run_stage_for, rerun, "neighbours", fetch_neighbours, recipe_name)
+    if recipe_name and fetch_videos is not None:
+        futures["videos"] = _executor.submit(_run_stage_for, rerun, "videos", fetch_videos, recipe_name)
+    futures["detail"] = _run_inline("detail", fetch_detail, recipe_id)
+    return DetailLoad(futures, started)
@@ -0,0 +1,194 @@
+"""
+공공 API 페이지와 영양 정보 CSV를 스트리밍 방식으로 SQLite에 적재하는 모듈입니다.
+
+전체 데이터를 DataFrame으로 모으지 않고, 페이지/청크 단위로
+  1) 컬럼 정규화(NATION_NM/NATION_CODE 재매핑, 숫자 변환)
+  2) 레시피명 임베딩 계산
+  3) 타입을 맞춘 executemany 업서트(INSERT ... ON CONFLICT DO UPDATE)
+를 수행하고 청크마다 커밋합니다. 메모리 사용량은 페이지 크기에만 비례하며,
+업서트이므로 중간에 실패해도 다시 실행하면 이어서(덮어쓰며) 적재됩니다.
+"""
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+import perf
+from data_load_func import iter_pages, fetch_basic_list, fetch_ingr_list, fetch_prc_list
+from db_schema import set_meta, bump_catalogue_version
+
+NATION_NM_REMAP = {'일본': '일식', '중국': '중식', '이탈리아': '양식', '서양': '양식', '동남아시아': '기타', '퓨전': '기타'}
+NATION_CODE_REMAP = {'3020009': '3020005', '3020006': '3020002'}
+
+NUTRITION_CSV_COLUMNS = {'식품군': 'FOOD_GROUP', '식품명': 'FOOD_NAME', '에너지': 'ENERGY', '탄수화물': 'CH',
+                         '단백질': 'PROTEIN', '지방': 'FAT', '당류': 'SUGAR'}
+
+CATALOGUE_STATE_KEY = "catalogue_ingest"
+
+
+# --- 청크 단위 정규화 ---
+def _to_int(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series, errors='coerce').astype('Int64')
+
+def normalize_basic_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """레시피 기본 정보 페이지의 카테고리를 재매핑하고 숫자 컬럼을 정수로 변환합니다."""
+    df = df.copy()
+    df['NATION_NM'] = df['NATION_NM'].replace(NATION_NM_REMAP)
+    df['NATION_CODE'] = df['NATION_CODE'].astype(str).replace(NATION_CODE_REMAP)
+    for col in ['CALORIE', 'COOKING_TIME', 'QNT']:
+        df[col] = pd.to_numeric(df[col].astype(str).str.replace(r'[^\d.]', '', regex=True), errors='coerce').fillna(0).astype(int)
+    for col in ['RECIPE_ID', 'NATION_CODE', 'TY_CODE']:
+        df[col] = _to_int(df[col])
+    return df
+
+def normalize_nutrition_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """영양 정보 CSV 청크의 컬럼명을 DB 컬럼명으로 바꾸고 수치 컬럼을 숫자로 변환합니다."""
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    df = df[list(NUTRITION_CSV_COLUMNS)].rename(columns=NUTRITION_CSV_COLUMNS)
+    for col in ['ENERGY', 'CH', 'PROTEIN', 'FAT', 'SUGAR']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    df['ENERGY'] = df['ENERGY'].round().astype(int)
+    return df.dropna(subset=['FOOD_NAME'])
+
+def iter_nutrition_chunks(path: str, chunksize: int = 1000):
+    """영양 정보 CSV를 chunksize 행씩 읽어 정규화된 DataFrame을 반환하는 제너레이터입니다."""
+    # 두 번째 줄은 단위(kcal, g ...) 행이므로 건너뜁니다.
+    for chunk in pd.read_csv(path, encoding='utf-8-sig', skiprows=[1], chunksize=chunksize):
+        yield normalize_nutrition_chunk(chunk)
+
+
+# --- 업서트 ---
+def _py(value):
+    """SQLite에 바인딩할 수 있도록 numpy/pandas 값을 파이썬 기본 타입으로 변환합니다."""
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def rows_of(df: pd.DataFrame, columns):
+    """DataFrame에서 columns 순서의 튜플 목록을 만듭니다."""
+    return [tuple(_py(v) for v in row) for row in df[columns].itertuples(index=False, name=None)]
+
+def number_steps(steps, next_no) -> list:
+    """
+    [(RECIPE_ID, 원본 단계 번호, 설명)]을 (RECIPE_ID, COOKING_NO, 설명) 행으로 만듭니다. 레시피의 원본 번호가 겹치지 않으면
+    그대로 쓰고, 겹치면 원본 번호 순(같으면 들어온 순)으로 다시 매깁니다. (migrations.rebuild_table과 같은 규칙)
+    next_no에는 레시피별 마지막 번호를 기록하여, 이미 적재한 레시피가 다시 나오면 그 뒤로 이어 붙입니다.
+    """
+    groups = defaultdict(list)
+    for recipe_id, number, description in steps:
+        groups[recipe_id].append((number, description))
+    rows = []
+    for recipe_id, group in groups.items():
+        numbers = [number for number, _ in group]
+        if recipe_id not in next_no and None not in numbers and len(set(numbers)) == len(numbers):
+            rows += [(recipe_id, number, description) for number, description in group]
+            next_no[recipe_id] = max(numbers)
+            continue
+        for _, description in sorted(group, key=lambda step: step[0] if step[0] is not None else 0):
+            next_no[recipe_id] += 1
+            rows.append((recipe_id, next_no[recipe_id], description))
+    return rows
+
+def upsert(conn, table: str, columns, key_columns, rows) -> int:
+    """key_columns 기준으로 행을 삽입하거나 갱신합니다. 처리한 행 수를 반환합니다."""
+    if not rows:
+        return 0
+    updates = [c for c in columns if c not in key_columns]
+    on_conflict = (
+        "DO UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in updates) if updates else "DO NOTHING"
+    )
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(key_columns)}) {on_conflict}"
+    )
+    conn.executemany(sql, rows)
+    return len(rows)
+
+
+# --- 적재 파이프라인 ---
+@perf.timed("ingest.catalogue")
+def ingest_catalogue(conn, model, basic_total=1000, ingr_total=6200, prc_total=3100, step=100):
+    """
+    세 API 엔드포인트를 페이지 단위로 읽어 카탈로그 테이블에 업서트합니다.
+    페이지마다 한 트랜잭션으로 커밋하며, 테이블별 처리 행 수를 dict로 반환합니다.
+    """
+    counts = defaultdict(int)
+    with conn:
+        set_meta(conn, CATALOGUE_STATE_KEY, "running")
+
+    # 자식 테이블 페이지에는 기본 정보 범위 밖의 RECIPE_ID가 섞여 있을 수 있어 적재 중에는 FK 검사를 끕니다.
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for page in iter_pages(fetch_basic_list, total=basic_total, step=step, raise_errors=True):
+            if page.empty:
+                continue
+            chunk = normalize_basic_chunk(page)
+            with perf.trace("model.encode"):
+                embeddings = model.encode(chunk['RECIPE_NM_KO'].fillna('').tolist())
+            chunk['EMBEDDING'] = [np.asarray(e, dtype=np.float32).tobytes() for e in embeddings]
+            with conn:
+                counts['NATION_INFO'] += upsert(conn, 'NATION_INFO', ['NATION_CODE', 'NATION_NM'], ['NATION_CODE'],
+                                                rows_of(chunk.drop_duplicates('NATION_CODE'), ['NATION_CODE', 'NATION_NM']))
+                counts['TYPE_INFO'] += upsert(conn, 'TYPE_INFO', ['TY_CODE', 'TY_NM'], ['TY_CODE'],
+                                              rows_of(chunk.drop_duplicates('TY_CODE'), ['TY_CODE', 'TY_NM']))
+                base_columns = ['RECIPE_ID', 'RECIPE_NM_KO', 'SUMRY', 'NATION_CODE', 'TY_CODE', 'COOKING_TIME', 'CALORIE', 'QNT', 'EMBEDDING']
+                counts['RECIPE_BASE'] += upsert(conn, 'RECIPE_BASE', base_columns, ['RECIPE_ID'], rows_of(chunk, base_columns))
+
+        # 재료 순번(IRDNT_SN)은 레시피별 등장 순서대로 매기므로 페이지를 넘어 카운터를 유지합니다.
+        next_sn = defaultdict(int)
+        for page in iter_pages(fetch_ingr_list, total=ingr_total, step=step, raise_errors=True):
+            if page.empty:
+                continue
+            rows = []
+            for recipe_id, name, capacity in page[['RECIPE_ID', 'IRDNT_NM', 'IRDNT_CPCTY']].itertuples(index=False, name=None):
+                recipe_id = int(recipe_id)
+                next_sn[recipe_id] += 1
+                rows.append((recipe_id, next_sn[recipe_id], name, capacity))
+            with conn:
+                counts['RECIPE_INGREDIENT'] += upsert(conn, 'RECIPE_INGREDIENT', ['RECIPE_ID', 'IRDNT_SN', 'IRDNT_NM', 'IRDNT_CPCTY'],
+                                                      ['RECIPE_ID', 'IRDNT_SN'], rows)
+
+        # 조리 단계 번호(COOKING_NO)도 적재하면서 새로 매깁니다. API가 한 레시피에 같은 단계 번호를 두 번
+        # 내려주는 경우가 있어(예: 176, 316) 원본 번호를 키로 쓰면 뒤 단계가 앞 단계를 덮어씁니다.
+        # 페이지 마지막 레시피의 단계는 다음 페이지에 이어질 수 있으므로 다음 페이지와 함께 처리합니다.
+        next_no = defaultdict(int)
+        held = []
+        for page in iter_pages(fetch_prc_list, total=prc_total, step=step, raise_errors=True):
+            if page.empty:
+                continue
+            page = page.assign(RECIPE_ID=_to_int(page['RECIPE_ID']), COOKING_NO=_to_int(page['COOKING_NO']))
+            steps = held + rows_of(page.dropna(subset=['RECIPE_ID']), ['RECIPE_ID', 'COOKING_NO', 'COOKING_DC'])
+            if not steps:
+                continue
+            last_id = steps[-1][0]
+            held = [s for s in steps if s[0] == last_id]
+            with conn:
+                counts['RECIPE_PROCESS'] += upsert(conn, 'RECIPE_PROCESS', ['RECIPE_ID', 'COOKING_NO', 'COOKING_DC'],
+                                                   ['RECIPE_ID', 'COOKING_NO'],
+                                                   number_steps([s for s in steps if s[0] != last_id], next_no))
+        if held:
+            with conn:
+                counts['RECIPE_PROCESS'] += upsert(conn, 'RECIPE_PROCESS', ['RECIPE_ID', 'COOKING_NO', 'COOKING_DC'],
+                                                   ['RECIPE_ID', 'COOKING_NO'], number_steps(held, next_no))
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+
+    with conn:
+        set_meta(conn, CATALOGUE_STATE_KEY, "done")
+        bump_catalogue_version(conn)
+    return dict(counts)
+
+@perf.timed("ingest.nutrition")
+def ingest_nutrition_csv(conn, path: str, chunksize: int = 1000) -> int:
+    """영양 정보 CSV를 청크 단위로 NUTRITION_INFO에 업서트하고 처리한 행 수를 반환합니다."""
+    columns = ['FOOD_GROUP', 'FOOD_NAME', 'ENERGY', 'PROTEIN', 'FAT', 'CH', 'SUGAR']
+    total = 0
+    for chunk in iter_nutrition_chunks(path, chunksize):
+        with conn:
+            total += upsert(conn, 'NUTRITION_INFO', columns, ['FOOD_NAME'], rows_of(chunk, columns))
+    with conn:
+        bump_catalogue_version(conn)
+    return total
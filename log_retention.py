@@ -0,0 +1,279 @@
+"""
+사용자 로그(SEARCH_LOG, RECOMMEND_LOG, DWELL_TIME_LOG) 보관 주기 관리 모듈입니다.
+
+보관 기간(RECIPE_LOG_RETENTION_DAYS, 기본 30일)이 지난 로그는
+  1) 날짜별로 파티션된 zstd 압축 Parquet 파일(ARCHIVE_DIR/<테이블>/date=YYYY-MM-DD/part-*.parquet)로 옮기고
+  2) 트렌드 탭에 필요한 일별 집계(SEARCH_KEYWORD_DAILY, RECIPE_VIEW_DAILY, KEYWORD_DWELL_DAILY)에 누적한 뒤
+  3) 운영 DB에서 삭제하여 DB 파일을 작게 유지합니다.
+
+체류 로그는 검색어로 집계되므로, 아직 운영 DB에 남아 있는 체류 로그가 참조하는 검색 로그는 함께 남겨둡니다.
+보관된 체류 로그에는 검색어(SRCH_KEYWORD)를 함께 저장하여 나중에 SEARCH_LOG 없이도 분석할 수 있습니다.
+
+트렌드 함수(trend_*)는 기간을 지정하지 않으면 운영 DB + 일별 집계로 빠르게 계산하고,
+기간을 지정하면 운영 DB의 해당 기간 로그와 기간에 해당하는 보관 파티션만 읽어서 계산합니다.
+
+사용 예:
+    python log_retention.py run --days 30 --vacuum   # 보관 실행 (cron 등에서 주기 실행)
+    python log_retention.py status                    # 운영 DB/보관 파티션 현황
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import db_schema
+import perf
+from search_logic import (
+    db_query, build_recipe_names_query, TREND_TOP_KEYWORDS_SQL, TREND_TOP_VIEWED_SQL, TREND_KEYWORD_DWELL_SQL,
+    TREND_RANGE_KEYWORDS_SQL, TREND_RANGE_VIEWS_SQL, TREND_RANGE_KEYWORD_DWELL_SQL
+)
+
+ARCHIVE_DIR = os.getenv("RECIPE_LOG_ARCHIVE_DIR", os.path.join("data", "log_archive"))
+RETENTION_DAYS = int(os.getenv("RECIPE_LOG_RETENTION_DAYS", "30"))
+RUN_INTERVAL_HOURS = 24
+LAST_RUN_KEY = "log_retention_last_run"
+DWELL_OUTLIER_SECONDS = 1800  # 트렌드 쿼리와 같은 기준: 30분 이상은 이상치
+
+
+def _ts(value: datetime) -> str:
+    """DB에 저장된 로그 시각(sqlite3 기본 datetime 어댑터 형식)과 문자열 비교가 가능한 형태로 변환합니다."""
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# --- 보관 파일 쓰기/읽기 ---
+def _write_partitions(df: pd.DataFrame, table: str, date_column: str, archive_dir: str, run_id: str):
+    """df를 날짜별 Parquet 파티션으로 저장하고 생성한 파일 경로 목록을 반환합니다."""
+    written = []
+    if df.empty:
+        return written
+    dates = df[date_column].astype(str).str[:10]
+    for day, part in df.groupby(dates):
+        part_dir = os.path.join(archive_dir, table, f"date={day}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{run_id}.parquet")
+        part.to_parquet(path, compression="zstd", index=False)
+        written.append(path)
+    return written
+
+def archived_dates(table: str, archive_dir: str = ARCHIVE_DIR):
+    """보관된 파티션 날짜 목록을 정렬하여 반환합니다."""
+    table_dir = os.path.join(archive_dir, table)
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(d.split("=", 1)[1] for d in os.listdir(table_dir) if d.startswith("date="))
+
+@perf.timed("log_archive.read")
+def read_archive(table: str, start: str = None, end: str = None, columns=None, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """
+    [start, end] 날짜(YYYY-MM-DD) 범위의 파티션만 읽어 하나의 DataFrame으로 반환합니다.
+    범위를 지정하지 않으면 해당 테이블의 모든 파티션을 읽습니다.
+    """
+    frames = []
+    for day in archived_dates(table, archive_dir):
+        if (start and day < start) or (end and day > end):
+            continue
+        part_dir = os.path.join(archive_dir, table, f"date={day}")
+        for name in sorted(os.listdir(part_dir)):
+            if name.endswith(".parquet"):
+                frames.append(pd.read_parquet(os.path.join(part_dir, name), columns=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    return pd.concat(frames, ignore_index=True)
+
+
+# --- 보관 실행 ---
+def _add_rollup(conn, table: str, key_columns, value_columns, df: pd.DataFrame):
+    """일별 집계 테이블에 값을 누적(upsert)합니다."""
+    if df.empty:
+        return
+    columns = key_columns + value_columns
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+        + ", ".join(f"{c} = {c} + excluded.{c}" for c in value_columns),
+        [tuple(v.item() if hasattr(v, "item") else v for v in row) for row in df[columns].itertuples(index=False, name=None)],
+    )
+
+@perf.timed("log_retention.run")
+def archive_old_logs(conn, retention_days: int = RETENTION_DAYS, archive_dir: str = ARCHIVE_DIR, now: datetime = None):
+    """
+    보관 기간이 지난 로그를 Parquet으로 옮기고 일별 집계에 누적한 뒤 운영 DB에서 삭제합니다.
+    DB 변경은 한 트랜잭션으로 처리하며, 실패하면 이번 실행에서 쓴 파일을 지우고 롤백합니다.
+    테이블별로 옮긴 행 수를 dict로 반환합니다.
+    """
+    cutoff = _ts((now or datetime.now()) - timedelta(days=retention_days))
+    run_id = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    written = []
+
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")  # 보관 중에는 다른 쓰기를 막아 조회/삭제 대상이 같도록 합니다.
+    try:
+        dwell = pd.read_sql_query(
+            """
+            SELECT d.VIEW_ID, d.SRCH_ID, d.RECIPE_ID, d.START_TIME, d.DWELL_TIME, s.SRCH_KEYWORD
+            FROM DWELL_TIME_LOG d
+            LEFT JOIN SEARCH_LOG s ON d.SRCH_ID = s.SRCH_ID
+            WHERE d.START_TIME < ?
+            """, conn, params=(cutoff,))
+        # 운영 DB에 남는 체류 로그가 참조하는 검색 로그는 보관하지 않습니다.
+        search = pd.read_sql_query(
+            """
+            SELECT SRCH_ID, SRCH_CODE, SRCH_KEYWORD, NATION_CODE, SRCH_TIME
+            FROM SEARCH_LOG
+            WHERE SRCH_TIME < ?
+              AND SRCH_ID NOT IN (
+                  SELECT SRCH_ID FROM DWELL_TIME_LOG
+                  WHERE SRCH_ID IS NOT NULL AND (START_TIME IS NULL OR START_TIME >= ?)
+              )
+            """, conn, params=(cutoff, cutoff))
+        recommend = pd.read_sql_query(
+            """
+            SELECT r.REC_ID, r.SRCH_ID, r.RECIPE_ID, s.SRCH_TIME
+            FROM RECOMMEND_LOG r
+            JOIN SEARCH_LOG s ON r.SRCH_ID = s.SRCH_ID
+            WHERE s.SRCH_TIME < ?
+              AND s.SRCH_ID NOT IN (
+                  SELECT SRCH_ID FROM DWELL_TIME_LOG
+                  WHERE SRCH_ID IS NOT NULL AND (START_TIME IS NULL OR START_TIME >= ?)
+              )
+            """, conn, params=(cutoff, cutoff))
+
+        written += _write_partitions(dwell, "DWELL_TIME_LOG", "START_TIME", archive_dir, run_id)
+        written += _write_partitions(search, "SEARCH_LOG", "SRCH_TIME", archive_dir, run_id)
+        written += _write_partitions(recommend, "RECOMMEND_LOG", "SRCH_TIME", archive_dir, run_id)
+
+        # 일별 집계: 트렌드 쿼리와 같은 조건으로 누적합니다.
+        if not search.empty:
+            keyword_daily = (search.dropna(subset=["SRCH_KEYWORD"])
+                             .assign(STAT_DATE=lambda df: df["SRCH_TIME"].astype(str).str[:10])
+                             .groupby(["STAT_DATE", "SRCH_KEYWORD"]).size().rename("SRCH_COUNT").reset_index())
+            _add_rollup(conn, "SEARCH_KEYWORD_DAILY", ["STAT_DATE", "SRCH_KEYWORD"], ["SRCH_COUNT"], keyword_daily)
+        if not dwell.empty:
+            dwell = dwell.assign(STAT_DATE=dwell["START_TIME"].astype(str).str[:10])
+            view_daily = (dwell.dropna(subset=["RECIPE_ID"])
+                          .groupby(["STAT_DATE", "RECIPE_ID"]).size().rename("VIEW_COUNT").reset_index())
+            _add_rollup(conn, "RECIPE_VIEW_DAILY", ["STAT_DATE", "RECIPE_ID"], ["VIEW_COUNT"], view_daily)
+            valid = dwell[dwell["DWELL_TIME"].notna() & (dwell["DWELL_TIME"] < DWELL_OUTLIER_SECONDS) & dwell["SRCH_KEYWORD"].notna()]
+            dwell_daily = (valid.groupby(["STAT_DATE", "SRCH_KEYWORD"])["DWELL_TIME"]
+                           .agg(DWELL_SUM="sum", DWELL_COUNT="count").reset_index())
+            _add_rollup(conn, "KEYWORD_DWELL_DAILY", ["STAT_DATE", "SRCH_KEYWORD"], ["DWELL_SUM", "DWELL_COUNT"], dwell_daily)
+
+        conn.executemany("DELETE FROM DWELL_TIME_LOG WHERE VIEW_ID = ?", [(int(i),) for i in dwell["VIEW_ID"]])
+        conn.executemany("DELETE FROM RECOMMEND_LOG WHERE REC_ID = ?", [(int(i),) for i in recommend["REC_ID"]])
+        conn.executemany("DELETE FROM SEARCH_LOG WHERE SRCH_ID = ?", [(int(i),) for i in search["SRCH_ID"]])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        for path in written:
+            os.remove(path)
+        raise
+
+    return {"SEARCH_LOG": len(search), "RECOMMEND_LOG": len(recommend), "DWELL_TIME_LOG": len(dwell)}
+
+def maybe_run_retention(conn, retention_days: int = RETENTION_DAYS, archive_dir: str = ARCHIVE_DIR):
+    """마지막 실행 후 RUN_INTERVAL_HOURS가 지났으면 보관을 실행합니다. (앱 시작 시 호출)"""
+    last_run = db_schema.get_meta(conn, LAST_RUN_KEY)
+    if last_run and datetime.fromisoformat(last_run) > datetime.now() - timedelta(hours=RUN_INTERVAL_HOURS):
+        return None
+    try:
+        moved = archive_old_logs(conn, retention_days, archive_dir)
+    except Exception as e:
+        print(f"Warning: 로그 보관 실행 실패: {e}")
+        return None
+    with conn:
+        db_schema.set_meta(conn, LAST_RUN_KEY, datetime.now().isoformat(timespec="seconds"))
+    if any(moved.values()):
+        print(f"Log retention: archived {moved} to {archive_dir}")
+    return moved
+
+
+# --- 트렌드 쿼리 ---
+def _day_range(start, end):
+    """date/datetime/문자열을 받아 (시작 시각, 끝 시각 미포함, 시작일, 끝일) 문자열을 반환합니다."""
+    start_day, end_day = str(start)[:10], str(end)[:10]
+    end_exclusive = (datetime.fromisoformat(end_day) + timedelta(days=1)).strftime("%Y-%m-%d")
+    return start_day, end_exclusive, start_day, end_day
+
+def trend_top_keywords(start=None, end=None, limit: int = 10, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """인기 검색 키워드. 기간이 없으면 운영 DB + 일별 집계, 있으면 운영 DB + 보관 파티션에서 계산합니다."""
+    if start is None:
+        return db_query(TREND_TOP_KEYWORDS_SQL)
+    lo, hi, start_day, end_day = _day_range(start, end or datetime.now())
+    hot = db_query(TREND_RANGE_KEYWORDS_SQL, (lo, hi))
+    archived = read_archive("SEARCH_LOG", start_day, end_day, columns=["SRCH_KEYWORD"], archive_dir=archive_dir)
+    rows = pd.concat([hot, archived], ignore_index=True)
+    if rows.empty:
+        return pd.DataFrame(columns=["SRCH_KEYWORD", "count"])
+    return (rows.groupby("SRCH_KEYWORD").size().rename("count").reset_index()
+            .sort_values("count", ascending=False).head(limit).reset_index(drop=True))
+
+def trend_top_viewed(start=None, end=None, limit: int = 10, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """가장 많이 본 레시피. 기간 지정 방식은 trend_top_keywords()와 같습니다."""
+    if start is None:
+        return db_query(TREND_TOP_VIEWED_SQL)
+    lo, hi, start_day, end_day = _day_range(start, end or datetime.now())
+    hot = db_query(TREND_RANGE_VIEWS_SQL, (lo, hi))
+    archived = read_archive("DWELL_TIME_LOG", start_day, end_day, columns=["RECIPE_ID"], archive_dir=archive_dir)
+    rows = pd.concat([hot, archived], ignore_index=True).dropna()
+    if rows.empty:
+        return pd.DataFrame(columns=["RECIPE_NM_KO", "view_count"])
+    counts = rows.groupby("RECIPE_ID").size().rename("view_count").reset_index()
+    names = db_query(*build_recipe_names_query(counts["RECIPE_ID"]))
+    counts["RECIPE_ID"] = counts["RECIPE_ID"].astype("int64")
+    merged = counts.merge(names, on="RECIPE_ID", how="inner")
+    return (merged.sort_values("view_count", ascending=False).head(limit)[["RECIPE_NM_KO", "view_count"]]
+            .reset_index(drop=True))
+
+def trend_keyword_dwell(start=None, end=None, limit: int = 10, min_views: int = 3, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """검색어별 평균 체류시간. 기간 지정 방식은 trend_top_keywords()와 같습니다."""
+    if start is None:
+        return db_query(TREND_KEYWORD_DWELL_SQL)
+    lo, hi, start_day, end_day = _day_range(start, end or datetime.now())
+    hot = db_query(TREND_RANGE_KEYWORD_DWELL_SQL, (lo, hi))
+    archived = read_archive("DWELL_TIME_LOG", start_day, end_day, columns=["SRCH_KEYWORD", "DWELL_TIME"], archive_dir=archive_dir)
+    rows = pd.concat([hot, archived], ignore_index=True)
+    rows = rows[rows["SRCH_KEYWORD"].notna() & rows["DWELL_TIME"].notna() & (rows["DWELL_TIME"] < DWELL_OUTLIER_SECONDS)]
+    if rows.empty:
+        return pd.DataFrame(columns=["SRCH_KEYWORD", "avg_dwell"])
+    stats = rows.groupby("SRCH_KEYWORD")["DWELL_TIME"].agg(avg_dwell="mean", n="count").reset_index()
+    return (stats[stats["n"] >= min_views].sort_values("avg_dwell", ascending=False).head(limit)
+            [["SRCH_KEYWORD", "avg_dwell"]].reset_index(drop=True))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="사용자 로그 보관(아카이브) 관리")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("--db", default=None, help="SQLite DB 경로 (기본: RECIPE_DB_FILE)")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="운영 DB에 남겨둘 기간(일)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--vacuum", action="store_true", help="보관 후 VACUUM으로 DB 파일 크기를 줄입니다.")
+    args = parser.parse_args(argv)
+
+    with sqlite3.connect(args.db or db_schema.DB_FILE) as conn:
+        db_schema.create_tables(conn)
+        if args.command == "run":
+            moved = archive_old_logs(conn, args.days, args.archive_dir)
+            with conn:
+                db_schema.set_meta(conn, LAST_RUN_KEY, datetime.now().isoformat(timespec="seconds"))
+            print(f"Archived rows: {moved}")
+            if args.vacuum:
+                conn.execute("VACUUM")
+                print("VACUUM done.")
+        else:
+            for table in ["SEARCH_LOG", "RECOMMEND_LOG", "DWELL_TIME_LOG"]:
+                hot = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                dates = archived_dates(table, args.archive_dir)
+                span = f"{dates[0]} ~ {dates[-1]}" if dates else "-"
+                print(f"{table}: hot rows={hot}, archived partitions={len(dates)} ({span})")
+            size = shutil.disk_usage(os.path.dirname(os.path.abspath(args.db or db_schema.DB_FILE)))
+            print(f"DB file: {os.path.getsize(args.db or db_schema.DB_FILE) / 1e6:.1f} MB (disk free {size.free / 1e9:.1f} GB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
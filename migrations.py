@@ -0,0 +1,246 @@
+"""
+버전 관리되는 DB 스키마 마이그레이션과 쿼리 플랜 검사 모듈입니다.
+
+- 적용된 버전은 PRAGMA user_version에 저장하며, migrate()는 아직 적용되지 않은 마이그레이션만 순서대로 실행합니다.
+- 새 변경은 MIGRATIONS 리스트 끝에 (버전, 설명, 함수)를 추가하는 방식으로 작성합니다.
+- check_query_plans()는 search_logic/app.py의 핫 쿼리를 EXPLAIN QUERY PLAN으로 확인하여
+  인덱스 없이 테이블 전체를 스캔하는 쿼리를 찾아냅니다.
+
+사용 예:
+    python migrations.py migrate           # 마이그레이션 적용
+    python migrations.py status            # 현재 스키마 버전 확인
+    python migrations.py check-plans       # 핫 쿼리 플랜 검사 (위반 시 종료 코드 1)
+"""
+import argparse
+import re
+import sqlite3
+import sys
+
+import db_schema
+import search_logic
+
+CATALOGUE_TABLES = ["NATION_INFO", "TYPE_INFO", "RECIPE_BASE", "RECIPE_INGREDIENT", "RECIPE_PROCESS", "NUTRITION_INFO"]
+
+INDEXES = {
+    # 카테고리 필터 (AI 검색/재료 검색)
+    "IDX_RECIPE_BASE_CATEGORY": "RECIPE_BASE (NATION_CODE, TY_CODE)",
+    "IDX_RECIPE_BASE_TYPE": "RECIPE_BASE (TY_CODE)",
+    # 재료 검색: LIKE '%키워드%'는 B-tree 탐색이 불가능하므로 테이블 대신 작은 커버링 인덱스만 스캔합니다.
+    "IDX_RECIPE_INGREDIENT_NAME": "RECIPE_INGREDIENT (IRDNT_NM, RECIPE_ID)",
+    # 트렌드 분석
+    "IDX_SEARCH_LOG_KEYWORD": "SEARCH_LOG (SRCH_KEYWORD)",
+    "IDX_SEARCH_LOG_TIME": "SEARCH_LOG (SRCH_TIME)",
+    "IDX_DWELL_TIME_LOG_RECIPE": "DWELL_TIME_LOG (RECIPE_ID)",
+    "IDX_DWELL_TIME_LOG_DWELL": "DWELL_TIME_LOG (DWELL_TIME, SRCH_ID)",
+    "IDX_DWELL_TIME_LOG_SRCH": "DWELL_TIME_LOG (SRCH_ID)",
+    "IDX_RECOMMEND_LOG_SRCH": "RECOMMEND_LOG (SRCH_ID)",
+    # 보관 로그 일별 집계 (전체 기간 트렌드)
+    "IDX_SEARCH_KEYWORD_DAILY_KEYWORD": "SEARCH_KEYWORD_DAILY (SRCH_KEYWORD, SRCH_COUNT)",
+    "IDX_RECIPE_VIEW_DAILY_RECIPE": "RECIPE_VIEW_DAILY (RECIPE_ID, VIEW_COUNT)",
+    "IDX_KEYWORD_DWELL_DAILY_KEYWORD": "KEYWORD_DWELL_DAILY (SRCH_KEYWORD, DWELL_SUM, DWELL_COUNT)",
+    "IDX_DWELL_TIME_LOG_START": "DWELL_TIME_LOG (START_TIME)",
+}
+
+
+# --- 마이그레이션 ---
+def _declared_constraints_missing(conn, table: str) -> bool:
+    """테이블이 선언된 PRIMARY KEY/FOREIGN KEY 없이 만들어졌는지 확인합니다. (예: to_sql(if_exists='replace'))"""
+    ddl = db_schema.TABLE_DDL[table]
+    has_pk = any(row[5] for row in conn.execute(f"PRAGMA table_info({table})"))
+    has_fk = bool(conn.execute(f"PRAGMA foreign_key_list({table})").fetchall())
+    return ("PRIMARY KEY" in ddl and not has_pk) or ("FOREIGN KEY" in ddl and not has_fk)
+
+# 기본 키가 겹치는 행을 순번 재부여로 살릴 수 있는 테이블: 테이블 -> (묶음 컬럼, 순번 컬럼)
+# 예: API가 같은 단계 번호를 두 번 내려준 조리 과정은 둘 다 다른 단계이므로 기존 순서대로 번호를 다시 매깁니다.
+RENUMBER_DUPLICATE_KEYS = {"RECIPE_PROCESS": ("RECIPE_ID", "COOKING_NO")}
+
+def _duplicate_keys(conn, table: str, key_columns, limit: int = 20):
+    """key_columns가 같은 행이 둘 이상인 키와 행 수를 최대 limit개 반환합니다. (NULL 키는 충돌하지 않으므로 제외)"""
+    keys = ", ".join(key_columns)
+    not_null = " AND ".join(f"{c} IS NOT NULL" for c in key_columns)
+    return conn.execute(
+        f"SELECT {keys}, COUNT(*) FROM {table} WHERE {not_null} GROUP BY {keys} HAVING COUNT(*) > 1 LIMIT ?", (limit,)
+    ).fetchall()
+
+def rebuild_table(conn, table: str):
+    """
+    선언된 DDL로 테이블을 다시 만들고 기존 데이터를 옮깁니다. (SQLite 권장 방식: 새 테이블 생성 → 복사 → 교체)
+    컬럼 타입 친화성에 따라 숫자 문자열은 정수로 저장됩니다. 기본 키가 겹치는 행이 있으면
+    RENUMBER_DUPLICATE_KEYS의 테이블은 해당 묶음의 순번을 기존 순서대로 다시 매기고, 그 밖의 테이블은 ValueError를 발생시킵니다.
+    """
+    old_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    new_ddl = re.sub(rf"CREATE TABLE IF NOT EXISTS {table}\b", f"CREATE TABLE {table}__new", db_schema.TABLE_DDL[table])
+    conn.execute(f"DROP TABLE IF EXISTS {table}__new")
+    conn.execute(new_ddl)
+    new_info = conn.execute(f"PRAGMA table_info({table}__new)").fetchall()
+    new_columns = [row[1] for row in new_info if row[1] in old_columns]
+    key_columns = [row[1] for row in sorted(new_info, key=lambda row: row[5]) if row[5]]
+
+    select = {c: c for c in new_columns}
+    duplicates = _duplicate_keys(conn, table, key_columns) if set(key_columns) <= set(old_columns) else []
+    if duplicates and table in RENUMBER_DUPLICATE_KEYS:
+        group, seq = RENUMBER_DUPLICATE_KEYS[table]
+        print(f"Migration: renumbering {seq} in {table} for duplicated keys {[tuple(d[:-1]) for d in duplicates]}", file=sys.stderr)
+        select[seq] = (
+            f"CASE WHEN {group} IN (SELECT {group} FROM {table} GROUP BY {group}, {seq} HAVING COUNT(*) > 1) "
+            f"THEN ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY {seq}, rowid) ELSE {seq} END"
+        )
+    elif duplicates:
+        conflicts = ", ".join(f"{tuple(d[:-1])} x{d[-1]}" for d in duplicates)
+        raise ValueError(f"{table}의 기본 키 {tuple(key_columns)}가 겹치는 행이 있어 마이그레이션을 중단합니다: {conflicts}")
+
+    columns = ", ".join(new_columns)
+    conn.execute(f"INSERT INTO {table}__new ({columns}) SELECT {', '.join(select.values())} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}__new RENAME TO {table}")
+
+def _m001_restore_constraints(conn):
+    for table in CATALOGUE_TABLES:
+        if _declared_constraints_missing(conn, table):
+            print(f"Migration: rebuilding {table} with declared constraints", file=sys.stderr)
+            rebuild_table(conn, table)
+
+def _m002_create_indexes(conn):
+    for name, target in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+def _m003_analyze(conn):
+    # 플래너가 인덱스 선택도를 판단할 수 있도록 통계를 수집합니다.
+    conn.execute("ANALYZE")
+
+MIGRATIONS = [
+    (1, "카탈로그 테이블의 선언된 PK/FK 제약조건 복원", _m001_restore_constraints),
+    (2, "검색/트렌드 쿼리용 보조 인덱스 생성", _m002_create_indexes),
+    (3, "쿼리 플래너 통계 수집", _m003_analyze),
+]
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn) -> int:
+    """
+    아직 적용되지 않은 마이그레이션을 순서대로 실행하고 최종 스키마 버전을 반환합니다.
+    마이그레이션마다 한 트랜잭션으로 적용하며, 테이블 재생성 중에는 FK 검사를 끕니다.
+    """
+    db_schema.create_tables(conn)
+    pending = [m for m in MIGRATIONS if m[0] > schema_version(conn)]
+
+    if pending:
+        conn.commit()
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            for version, description, func in pending:
+                try:
+                    conn.execute("BEGIN")
+                    func(conn)
+                    conn.execute(f"PRAGMA user_version = {int(version)}")
+                    conn.execute("COMMIT")
+                    print(f"Migration {version} applied: {description}", file=sys.stderr)
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+
+    # INDEXES에 새로 추가된 인덱스도 바로 생성되도록 매번 확인하고, 필요한 경우에만 통계를 갱신합니다.
+    _m002_create_indexes(conn)
+    conn.execute("PRAGMA optimize")
+    conn.commit()
+    return schema_version(conn)
+
+
+# --- 쿼리 플랜 검사 ---
+# 인덱스로 대체할 수 없는 전체 스캔은 이유와 함께 허용 목록에 둡니다.
+ALLOWED_FULL_SCANS = {
+    "name_search_all": "필터 없는 AI 검색은 모든 레시피의 임베딩을 읽어야 하므로 전체 스캔이 정상입니다.",
+    "nation_options": "NATION_INFO는 수 행짜리 코드 테이블이며 INTEGER PRIMARY KEY 순서로 읽습니다.",
+    "type_options": "TYPE_INFO는 수십 행짜리 코드 테이블이며 INTEGER PRIMARY KEY 순서로 읽습니다.",
+    "slow_perf_log": "PERF_ID(rowid) 역순으로 LIMIT 100만 읽습니다.",
+}
+
+def hot_queries():
+    """(이름, SQL, 파라미터) 목록. search_logic과 app.py가 실제로 실행하는 쿼리를 그대로 사용합니다."""
+    sl = search_logic
+    queries = []
+    for suffix, nation, ty in [("all", None, None), ("nation", 3020001, None), ("type", None, 3010001), ("nation_type", 3020001, 3010001)]:
+        queries.append((f"name_search_{suffix}", *sl.build_name_search_query(nation, ty)))
+        queries.append((f"ingredient_search_{suffix}", *sl.build_ingredient_search_query("김치", nation, ty)))
+    queries += [
+        ("detail_base", sl.DETAIL_BASE_SQL, (1,)),
+        ("detail_ingredients", sl.DETAIL_INGREDIENT_SQL, (1,)),
+        ("detail_process", sl.DETAIL_PROCESS_SQL, (1,)),
+        ("nutrition_lookup", "SELECT * FROM NUTRITION_INFO WHERE FOOD_NAME IN (?, ?)", ("쌀", "보리")),
+        ("nation_options", sl.NATION_OPTIONS_SQL, ()),
+        ("type_options", sl.TYPE_OPTIONS_SQL, ()),
+        ("nutrition_names", sl.NUTRITION_NAMES_SQL, ()),
+        ("trend_top_keywords", sl.TREND_TOP_KEYWORDS_SQL, ()),
+        ("trend_top_viewed", sl.TREND_TOP_VIEWED_SQL, ()),
+        ("trend_keyword_dwell", sl.TREND_KEYWORD_DWELL_SQL, ()),
+        ("trend_range_keywords", sl.TREND_RANGE_KEYWORDS_SQL, ("2024-01-01", "2024-02-01")),
+        ("trend_range_views", sl.TREND_RANGE_VIEWS_SQL, ("2024-01-01", "2024-02-01")),
+        ("trend_range_keyword_dwell", sl.TREND_RANGE_KEYWORD_DWELL_SQL, ("2024-01-01", "2024-02-01")),
+        ("trend_range_recipe_names", *sl.build_recipe_names_query([1, 2, 3])),
+        ("slow_perf_log", sl.SLOW_PERF_LOG_SQL, ()),
+    ]
+    return queries
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+def explain(conn, sql: str, params=()):
+    """EXPLAIN QUERY PLAN 결과의 detail 문자열 목록을 반환합니다."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def check_query_plans(conn):
+    """
+    인덱스 없이 테이블 전체를 스캔하는 핫 쿼리를 찾아 (이름, 플랜 줄) 목록으로 반환합니다.
+    'SCAN t USING (COVERING) INDEX ...'처럼 인덱스를 통한 스캔은 허용합니다.
+    """
+    violations = []
+    for name, sql, params in hot_queries():
+        if name in ALLOWED_FULL_SCANS:
+            continue
+        plan = [detail.strip() for detail in explain(conn, sql, params)]
+        # 서브쿼리 결과(MATERIALIZE/CO-ROUTINE)를 읽는 SCAN은 테이블 스캔이 아닙니다.
+        subqueries = {detail.split()[-1] for detail in plan if detail.startswith(("MATERIALIZE", "CO-ROUTINE"))}
+        for detail in plan:
+            match = _FULL_SCAN.match(detail)
+            if match and match.group(1) not in subqueries:
+                violations.append((name, detail))
+    return violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DB 스키마 마이그레이션 및 쿼리 플랜 검사")
+    parser.add_argument("command", choices=["migrate", "status", "check-plans"])
+    parser.add_argument("--db", default=None, help="SQLite DB 경로 (기본: RECIPE_DB_FILE)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="check-plans에서 모든 쿼리 플랜 출력")
+    args = parser.parse_args(argv)
+
+    with sqlite3.connect(args.db or db_schema.DB_FILE) as conn:
+        if args.command == "migrate":
+            print(f"Schema version: {migrate(conn)}")
+        elif args.command == "status":
+            latest = MIGRATIONS[-1][0]
+            current = schema_version(conn)
+            print(f"Schema version: {current} (latest: {latest})")
+            return 0 if current >= latest else 1
+        else:
+            if schema_version(conn) < MIGRATIONS[-1][0]:
+                # 테이블/인덱스가 없는 DB에서는 플랜을 검사할 수 없습니다.
+                print(f"Schema version {schema_version(conn)} is older than {MIGRATIONS[-1][0]}. Run 'python migrations.py migrate' first.")
+                return 1
+            if args.verbose:
+                for name, sql, params in hot_queries():
+                    print(f"[{name}]")
+                    for detail in explain(conn, sql, params):
+                        print(f"    {detail}")
+            violations = check_query_plans(conn)
+            for name, detail in violations:
+                print(f"FULL SCAN in {name}: {detail}")
+            print("OK: all hot queries use indexes." if not violations else f"{len(violations)} full scan(s) found.")
+            return 1 if violations else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
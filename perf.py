@@ -0,0 +1,181 @@
+"""
+핫 패스 성능 측정용 경량 타이밍/트레이스 모듈입니다.
+
+- trace(op): 구간 측정용 컨텍스트 매니저
+- timed(op): 함수 전체 측정용 데코레이터
+비활성화 상태(기본값)에서는 플래그 확인 한 번만 하므로 오버헤드가 거의 없습니다.
+환경 변수 RECIPE_PERF_TRACE=1 또는 enable()로 켤 수 있습니다.
+
+측정값은 프로세스 전역 링 버퍼에 (시각, 세션 ID, rerun 번호, 작업명, ms) 형태로 쌓이며,
+SLOW_MS 이상 걸린 샘플은 PERF_LOG 테이블에 기록됩니다.
+rerun 번호는 스레드별로 유지하므로 여러 세션의 rerun이 동시에 실행되어도 섞이지 않습니다.
+(워커 스레드에서 측정할 때는 rerun_context()로 제출한 쪽의 rerun을 이어받습니다)
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+
+import db_schema
+
+ENABLED = os.getenv("RECIPE_PERF_TRACE", "0") == "1"
+SLOW_MS = float(os.getenv("RECIPE_PERF_SLOW_MS", "500"))
+BUFFER_SIZE = int(os.getenv("RECIPE_PERF_BUFFER", "5000"))
+SLOW_FLUSH_SIZE = 50
+
+_samples = deque(maxlen=BUFFER_SIZE)
+_slow_pending = []
+_lock = threading.Lock()
+_rerun_counter = 0
+_local = threading.local()  # 스레드별 현재 rerun: (세션 ID, rerun 번호)
+
+
+def enable(on: bool = True):
+    """트레이스를 켜거나 끕니다."""
+    global ENABLED
+    ENABLED = on
+
+
+def new_rerun(session_id: str = None) -> int:
+    """
+    현재 스레드에서 새 rerun(스크립트 재실행)이 시작되었음을 표시하고 rerun 번호를 반환합니다.
+    번호는 프로세스 전체에서 고유하며, session_id로 세션별 rerun을 구분합니다.
+    """
+    global _rerun_counter
+    with _lock:
+        _rerun_counter += 1
+        rerun_id = _rerun_counter
+    _local.rerun = (session_id, rerun_id)
+    return rerun_id
+
+
+def current_rerun():
+    """현재 스레드의 (세션 ID, rerun 번호)를 반환합니다."""
+    return getattr(_local, "rerun", (None, 0))
+
+
+@contextmanager
+def rerun_context(rerun):
+    """워커 스레드에서 current_rerun()으로 받은 rerun에 측정값을 기록하도록 합니다."""
+    previous = current_rerun()
+    _local.rerun = rerun
+    try:
+        yield
+    finally:
+        _local.rerun = previous
+
+
+def record(op: str, elapsed_ms: float):
+    """측정값 하나를 링 버퍼에 추가합니다. 느린 샘플은 PERF_LOG 기록 대기열에 넣습니다."""
+    now = datetime.now()
+    session_id, rerun_id = current_rerun()
+    _samples.append((now, session_id, rerun_id, op, elapsed_ms))
+    if elapsed_ms >= SLOW_MS:
+        with _lock:
+            _slow_pending.append((now, rerun_id, op, round(elapsed_ms, 3)))
+            should_flush = len(_slow_pending) >= SLOW_FLUSH_SIZE
+        if should_flush:
+            flush()
+
+
+@contextmanager
+def trace(op: str):
+    """with 블록의 실행 시간을 op 이름으로 기록합니다."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(op, (time.perf_counter() - start) * 1000)
+
+
+def timed(op: str):
+    """함수 실행 시간을 op 이름으로 기록하는 데코레이터입니다."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(op, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+
+def flush():
+    """대기 중인 느린 샘플을 PERF_LOG 테이블에 저장합니다."""
+    with _lock:
+        rows = _slow_pending[:]
+        _slow_pending.clear()
+    if not rows:
+        return
+    try:
+        with sqlite3.connect(db_schema.DB_FILE) as conn:
+            conn.executemany(
+                "INSERT INTO PERF_LOG (LOG_TIME, RERUN_ID, OP_NM, ELAPSED_MS) VALUES (?, ?, ?, ?)", rows
+            )
+    except sqlite3.Error as e:
+        print(f"Warning: PERF_LOG 저장 실패: {e}")
+
+
+def samples():
+    """링 버퍼의 샘플 목록 사본을 반환합니다."""
+    return list(_samples)
+
+
+def clear():
+    """링 버퍼를 비웁니다."""
+    _samples.clear()
+
+
+def summary():
+    """작업별 호출 수와 지연 시간 분위수(ms)를 dict 리스트로 반환합니다. (총 소요 시간 내림차순)"""
+    by_op = {}
+    for _, _, _, op, ms in samples():
+        by_op.setdefault(op, []).append(ms)
+    rows = []
+    for op, values in by_op.items():
+        arr = np.array(values)
+        p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+        rows.append({
+            "op": op, "count": arr.size, "total_ms": round(float(arr.sum()), 2),
+            "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2), "max_ms": round(float(arr.max()), 2),
+        })
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+
+def histogram(op: str, bins: int = 20):
+    """op의 지연 시간 히스토그램을 로그 스케일 구간으로 계산하여 (구간 경계, 개수)를 반환합니다."""
+    values = np.array([ms for _, _, _, name, ms in samples() if name == op])
+    if values.size == 0:
+        return np.array([]), np.array([])
+    low, high = max(values.min(), 1e-3), max(values.max(), 1e-3)
+    edges = np.geomspace(low, high * 1.0001, bins + 1) if high > low else np.array([low, low * 1.0001])
+    counts, edges = np.histogram(values, bins=edges)
+    return edges, counts
+
+
+def rerun_breakdown(last_n: int = 20, session_id: str = None):
+    """최근 last_n개 rerun에 대해 (rerun 번호, 작업명, 합계 ms) 리스트를 반환합니다. session_id를 주면 그 세션의 rerun만 봅니다."""
+    totals = {}
+    for _, sample_session, rerun_id, op, ms in samples():
+        if session_id is not None and sample_session != session_id:
+            continue
+        totals[(rerun_id, op)] = totals.get((rerun_id, op), 0.0) + ms
+    recent = sorted({rerun_id for rerun_id, _ in totals})[-last_n:]
+    return [
+        {"rerun": rerun_id, "op": op, "total_ms": round(ms, 2)}
+        for (rerun_id, op), ms in sorted(totals.items()) if rerun_id in recent
+    ]
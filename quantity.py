@@ -0,0 +1,188 @@
+"""
+재료 분량 문자열(IRDNT_CPCTY)을 안전하게 해석하여 그램으로 환산하는 모듈입니다.
+
+"1/2컵", "1과 1/2큰술", "1~2개", "½작은술", "200g", "반모", "한줌", "1컵(200g)"처럼
+분수/대분수/범위/한글 단위가 섞인 문자열을 미리 컴파일한 정규식으로 (수량, 단위)로 나누고,
+단위별 그램 환산표와 재료별 밀도/개당 무게 보정표로 그램을 계산합니다. eval은 사용하지 않습니다.
+
+같은 문자열이 수천 행에 반복되므로 parse_quantity()/재료별 보정은 고유 값 단위로 메모이제이션하고,
+quantities_to_grams()는 테이블 전체를 고유 값만 해석한 뒤 벡터 연산으로 펼칩니다.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Quantity(NamedTuple):
+    amount: Optional[float]
+    unit: Optional[str]
+
+
+# --- 토크나이저 ---
+_UNICODE_FRACTIONS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8", "⅜": "3/8"}
+_KOREAN_NUMBERS = {"반": "0.5", "한": "1", "두": "2", "세": "3", "네": "4", "다섯": "5"}
+
+_NUMBER = r"\d+(?:\.\d+)?(?:\s*/\s*\d+)?"
+# 대분수: "1과1/2", "1와 1/2", "1+1/2", "1 1/2"
+_MIXED = re.compile(r"(\d+)\s*(?:과|와|\+|\s)\s*(\d+\s*/\s*\d+)")
+# (수량)(~수량)?(단위)?  예: "1~2큰술", "20-25g", "3 T"
+_TOKEN = re.compile(rf"({_NUMBER})(?:\s*[~\-]\s*({_NUMBER}))?\s*([가-힣a-zA-Z]+)?")
+# 천 단위 구분 쉼표: "1,000g"
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+_SIZE_PREFIX = re.compile(r"^[소중대]\s*(?=\d)")
+_UNIT_SUFFIXES = r"씩|정도|분량"
+_UNIT_SUFFIX = re.compile(rf"({_UNIT_SUFFIXES})$")
+
+# 단위 표기 통일 (대소문자 구분: T=큰술, t=작은술)
+UNIT_ALIASES = {
+    "T": "큰술", "Ts": "큰술", "TS": "큰술", "Tbsp": "큰술", "tbsp": "큰술", "큰": "큰술", "스푼": "큰술", "숟가락": "큰술", "밥숟가락": "큰술",
+    "t": "작은술", "ts": "작은술", "tsp": "작은술", "티스푼": "작은술", "찻숟가락": "작은술",
+    "C": "컵", "c": "컵", "cup": "컵",
+    "G": "g", "그램": "g", "gram": "g",
+    "Kg": "kg", "KG": "kg", "킬로": "kg",
+    "mL": "ml", "ML": "ml", "cc": "ml", "CC": "ml",
+    "l": "L", "리터": "L",
+}
+# 수량 없이 쓰는 표현은 소량(1단위)으로 봅니다.
+VAGUE_AMOUNTS = {"약간": "약간", "조금": "약간", "적당량": "적당량", "적량": "적당량", "적당히": "적당량", "소량": "약간", "톡톡": "약간"}
+
+
+def _to_number(token: str) -> float:
+    if "/" in token:
+        numerator, denominator = (float(x) for x in token.split("/"))
+        return numerator / denominator if denominator else np.nan
+    return float(token)
+
+def _normalize_unit(unit: Optional[str]) -> Optional[str]:
+    if not unit:
+        return None
+    unit = _UNIT_SUFFIX.sub("", unit) or None
+    return UNIT_ALIASES.get(unit, unit) if unit else None
+
+@lru_cache(maxsize=None)
+def parse_quantity(text) -> Quantity:
+    """
+    분량 문자열을 (수량, 단위)로 해석합니다. 범위는 중간값을 사용하며,
+    "1컵(200g)"처럼 괄호 안에 무게/부피가 함께 적혀 있으면 그 값을 우선합니다.
+    해석할 수 없으면 Quantity(None, None)을 반환합니다.
+    """
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return Quantity(None, None)
+    text = str(text).strip()
+    for vague, unit in VAGUE_AMOUNTS.items():
+        if text.startswith(vague):
+            return Quantity(1.0, unit)
+    for symbol, fraction in _UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, fraction)
+    text = _THOUSANDS.sub("", text)
+    text = _KOREAN_NUMBER.sub(lambda m: _KOREAN_NUMBERS[m.group(1)], text)
+    text = _SIZE_PREFIX.sub("", text)
+    text = _MIXED.sub(lambda m: str(int(m.group(1)) + _to_number(m.group(2).replace(" ", ""))), text)
+
+    tokens = []
+    for low, high, unit in _TOKEN.findall(text):
+        amount = _to_number(low.replace(" ", ""))
+        if high:
+            amount = (amount + _to_number(high.replace(" ", ""))) / 2
+        tokens.append(Quantity(amount, _normalize_unit(unit)))
+    if not tokens:
+        return Quantity(None, None)
+    for token in tokens:
+        if token.unit in ABSOLUTE_UNIT_GRAMS:
+            return token
+    return tokens[0]
+
+
+# --- 그램 환산 ---
+# 물 기준 무게/부피 단위 (컵은 한국 계량컵 200ml)
+ABSOLUTE_UNIT_GRAMS = {"g": 1.0, "kg": 1000.0, "ml": 1.0, "L": 1000.0}
+VOLUME_UNIT_ML = {"큰술": 15.0, "작은술": 5.0, "컵": 200.0, "ml": 1.0, "L": 1000.0}
+# 재료와 무관한 기본 환산값 (개수 단위는 재료별 보정이 없을 때의 대략적인 값)
+UNIT_GRAMS = {
+    **ABSOLUTE_UNIT_GRAMS, **VOLUME_UNIT_ML,
+    "약간": 2.0, "적당량": 5.0, "줌": 30.0, "꼬집": 0.5,
+    "개": 100.0, "알": 10.0, "톨": 5.0, "쪽": 5.0, "장": 10.0, "잎": 2.0,
+    "공기": 210.0, "그릇": 300.0, "인분": 200.0, "마리": 300.0, "모": 300.0, "포기": 1500.0,
+    "뿌리": 50.0, "대": 60.0, "줄기": 20.0, "송이": 100.0, "단": 300.0, "봉": 200.0, "봉지": 200.0,
+    "캔": 200.0, "팩": 200.0, "통": 300.0, "토막": 80.0, "조각": 30.0, "줄": 50.0, "근": 600.0, "되": 1600.0, "말": 16000.0, "관": 3750.0,
+    "묶음": 300.0, "덩이": 200.0, "덩어리": 200.0, "cm": 2.0,
+}
+# 부피 단위에 곱하는 재료별 밀도 (g/ml). 재료명에 키워드가 포함되면 적용합니다.
+DENSITY_OVERRIDES = {
+    "간장": 1.2, "소금": 1.2, "설탕": 0.85, "흑설탕": 0.8, "꿀": 1.4, "물엿": 1.4, "올리고당": 1.3, "조청": 1.4,
+    "고추장": 1.3, "된장": 1.2, "쌈장": 1.2, "고춧가루": 0.45, "후춧가루": 0.5, "깨": 0.6, "참깨": 0.6,
+    "밀가루": 0.55, "부침가루": 0.55, "튀김가루": 0.55, "전분": 0.6, "녹말": 0.6, "빵가루": 0.3,
+    "기름": 0.92, "식용유": 0.92, "참기름": 0.92, "들기름": 0.92, "올리브유": 0.92, "버터": 0.95, "마요네즈": 0.95,
+    "쌀": 0.85, "찹쌀": 0.85, "다진마늘": 1.0, "다진 마늘": 1.0, "우유": 1.03, "식초": 1.0, "맛술": 1.0, "청주": 1.0,
+}
+# 개수 단위의 재료별 무게 (g). 재료명에 키워드가 포함되면 UNIT_GRAMS 대신 사용합니다.
+PIECE_GRAMS_OVERRIDES = {
+    "달걀": {"개": 50.0, "알": 50.0}, "계란": {"개": 50.0, "알": 50.0}, "메추리알": {"개": 10.0, "알": 10.0},
+    "양파": {"개": 200.0}, "감자": {"개": 150.0}, "고구마": {"개": 200.0}, "당근": {"개": 150.0},
+    "애호박": {"개": 300.0}, "오이": {"개": 200.0}, "가지": {"개": 150.0}, "토마토": {"개": 150.0},
+    "풋고추": {"개": 10.0}, "청양고추": {"개": 10.0}, "홍고추": {"개": 15.0}, "고추": {"개": 10.0},
+    "마늘": {"쪽": 5.0, "톨": 5.0, "개": 5.0, "통": 40.0}, "생강": {"쪽": 10.0, "톨": 10.0},
+    "대파": {"뿌리": 100.0, "대": 100.0, "줄기": 50.0}, "쪽파": {"뿌리": 10.0, "줄기": 10.0, "단": 200.0},
+    "두부": {"모": 300.0}, "배추": {"포기": 2000.0, "잎": 40.0}, "양배추": {"통": 1000.0, "잎": 30.0},
+    "김": {"장": 2.0}, "깻잎": {"장": 2.0}, "사과": {"개": 250.0}, "레몬": {"개": 100.0}, "밥": {"공기": 210.0},
+    "멸치": {"마리": 3.0}, "새우": {"마리": 20.0},
+}
+
+# 한글 수사("반모", "한줌", "두 큰술")는 바로 뒤에 아는 단위가 올 때만 숫자로 바꿉니다. ("두부 1모"의 '두'는 그대로)
+_KOREAN_UNITS = sorted((u for u in {*UNIT_GRAMS, *UNIT_ALIASES} if re.fullmatch(r"[가-힣]+", u)), key=len, reverse=True)
+_KOREAN_NUMBER = re.compile(
+    rf"^({'|'.join(_KOREAN_NUMBERS)})(?=\s*(?:{'|'.join(_KOREAN_UNITS)})(?:{_UNIT_SUFFIXES})?(?![가-힣]))"
+)
+
+
+@lru_cache(maxsize=None)
+def unit_grams(unit: Optional[str], ingredient: str = "") -> float:
+    """ingredient의 unit 1단위 무게(g). 환산할 수 없으면 NaN을 반환합니다. (재료명/단위 조합별로 메모이제이션)"""
+    if unit is None:
+        return np.nan
+    ingredient = ingredient or ""
+    if unit in VOLUME_UNIT_ML:
+        keyword = _longest_keyword(DENSITY_OVERRIDES, ingredient)
+        return VOLUME_UNIT_ML[unit] * (DENSITY_OVERRIDES[keyword] if keyword else 1.0)
+    keyword = _longest_keyword({k: v for k, v in PIECE_GRAMS_OVERRIDES.items() if unit in v}, ingredient)
+    if keyword:
+        return PIECE_GRAMS_OVERRIDES[keyword][unit]
+    return UNIT_GRAMS.get(unit, np.nan)
+
+def _longest_keyword(table: dict, ingredient: str) -> Optional[str]:
+    """ingredient에 포함된 table의 키워드 중 가장 긴 것을 반환합니다. ("흑설탕"은 "설탕"보다 "흑설탕" 항목을 사용)"""
+    return max((keyword for keyword in table if keyword in ingredient), key=len, default=None)
+
+def to_grams(text, ingredient: str = "") -> float:
+    """분량 문자열 하나를 그램으로 환산합니다. 환산할 수 없으면 NaN을 반환합니다."""
+    amount, unit = parse_quantity(text)
+    if amount is None:
+        return np.nan
+    if unit is None:
+        # 단위 없는 숫자는 그램으로 적은 경우가 대부분입니다. (예: "50")
+        return amount
+    return amount * unit_grams(unit, ingredient)
+
+def parse_quantities(capacities: pd.Series) -> pd.DataFrame:
+    """분량 컬럼 전체를 고유 값만 해석하여 AMOUNT/UNIT 컬럼의 DataFrame으로 반환합니다."""
+    codes, uniques = pd.factorize(capacities.astype("string"), use_na_sentinel=True)
+    parsed = [parse_quantity(u) for u in uniques] + [Quantity(None, None)]  # -1(NA) 코드는 마지막 항목
+    amounts = np.array([np.nan if q.amount is None else q.amount for q in parsed], dtype=float)
+    units = np.array([q.unit for q in parsed], dtype=object)
+    return pd.DataFrame({"AMOUNT": amounts[codes], "UNIT": units[codes]}, index=capacities.index)
+
+def quantities_to_grams(names: pd.Series, capacities: pd.Series) -> pd.Series:
+    """
+    재료명/분량 컬럼을 그램으로 환산한 Series를 반환합니다. (RECIPE_INGREDIENT 전체에 한 번에 적용)
+    단위 환산은 고유한 (재료명, 단위) 조합만 계산하고 수량과의 곱은 벡터 연산으로 처리합니다.
+    """
+    parsed = parse_quantities(capacities)
+    pairs = pd.DataFrame({"NAME": names.fillna("").astype(str).to_numpy(), "UNIT": parsed["UNIT"].to_numpy()})
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(pairs.fillna({"UNIT": ""})))
+    factors = np.array([unit_grams(unit or None, name) for name, unit in uniques], dtype=float)
+    factors = factors[codes]
+    factors[parsed["UNIT"].isna().to_numpy()] = 1.0  # 단위 없는 숫자는 그램으로 봅니다.
+    return pd.Series(parsed["AMOUNT"].to_numpy() * factors, index=capacities.index, name="GRAMS")
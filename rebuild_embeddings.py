@@ -0,0 +1,220 @@
+"""
+레시피 카탈로그 전체의 임베딩을 여러 프로세스로 병렬 재생성하는 CLI입니다.
+
+모델을 바꾸거나 카탈로그를 갱신한 뒤 임베딩을 다시 계산할 때 사용합니다.
+  1) EMBEDDING_GENERATION에 새 세대('building')를 만들고
+  2) 레시피를 배치로 나누어 프로세스 풀에 분배합니다. 각 워커는 자체 인코더를 한 번만 로드하며,
+     torch 스레드 수는 (CPU 코어 수 / 워커 수)로 맞춰 프로세스끼리 코어를 과점유하지 않도록 합니다.
+  3) 결과는 메모리에 모았다가 --checkpoint 행마다 짧은 트랜잭션 하나로 RECIPE_EMBEDDING(GENERATION, RECIPE_ID)에 기록합니다.
+     인코딩하는 동안에는 쓰기 잠금을 잡지 않으므로 앱의 로그 기록이 막히지 않습니다.
+     중단된 경우 같은 모델로 다시 실행하면 이미 계산된 레시피를 건너뛰고 이어서 진행합니다.
+  4) 모든 레시피의 임베딩이 준비되면 한 트랜잭션으로 RECIPE_BASE.EMBEDDING을 새 세대로 교체(전환)합니다.
+재생성 중에도 검색은 RECIPE_BASE.EMBEDDING(이전 세대)을 그대로 사용합니다.
+
+사용 예:
+    python rebuild_embeddings.py build --workers 4              # 현재 모델로 재생성 후 전환
+    python rebuild_embeddings.py build --model <모델 이름>       # 다른 모델로 교체
+    python rebuild_embeddings.py status                         # 세대별 진행 상황
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+import numpy as np
+
+import db_schema
+from search_logic import DEFAULT_MODEL_NAME, EMBEDDING_MODEL_KEY
+
+BUILDING, ACTIVE, RETIRED = "building", "active", "retired"
+
+PENDING_SQL = """
+    SELECT b.RECIPE_ID, b.RECIPE_NM_KO
+    FROM RECIPE_BASE b
+    WHERE NOT EXISTS (
+        SELECT 1 FROM RECIPE_EMBEDDING e WHERE e.GENERATION = ? AND e.RECIPE_ID = b.RECIPE_ID
+    )
+    ORDER BY b.RECIPE_ID
+"""
+
+
+# --- 워커 프로세스 ---
+_encoder = None
+
+def _load_encoder(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def _init_worker(model_name: str, torch_threads: int):
+    """워커마다 한 번 실행됩니다. 인코더를 로드하고 torch 스레드 수를 제한합니다."""
+    global _encoder
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _encoder = _load_encoder(model_name)
+
+def _encode_batch(batch):
+    """[(RECIPE_ID, 레시피명)] 배치를 인코딩하여 [(RECIPE_ID, float32 BLOB)]을 반환합니다."""
+    ids = [recipe_id for recipe_id, _ in batch]
+    embeddings = _encoder.encode([name or "" for _, name in batch], show_progress_bar=False)
+    return [(recipe_id, np.asarray(e, dtype=np.float32).tobytes()) for recipe_id, e in zip(ids, embeddings)]
+
+
+# --- 세대 관리 ---
+def start_generation(conn, model_name: str) -> int:
+    """같은 모델로 진행 중이던 세대가 있으면 이어서 사용하고, 없으면 새 세대를 만듭니다."""
+    row = conn.execute(
+        "SELECT GENERATION FROM EMBEDDING_GENERATION WHERE STATUS = ? AND MODEL_NAME = ? ORDER BY GENERATION DESC LIMIT 1",
+        (BUILDING, model_name),
+    ).fetchone()
+    if row:
+        return row[0]
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO EMBEDDING_GENERATION (MODEL_NAME, STATUS, CREATED_AT) VALUES (?, ?, ?)",
+            (model_name, BUILDING, datetime.now()),
+        )
+    return cursor.lastrowid
+
+def activate_generation(conn, generation: int):
+    """
+    완성된 세대를 RECIPE_BASE.EMBEDDING으로 복사하고 활성 세대로 표시합니다. (한 트랜잭션)
+    이전 세대의 임베딩 행은 삭제합니다. 빠진 레시피가 있으면 ValueError를 발생시킵니다.
+    """
+    model_name = conn.execute(
+        "SELECT MODEL_NAME FROM EMBEDDING_GENERATION WHERE GENERATION = ?", (generation,)
+    ).fetchone()[0]
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        missing = conn.execute(f"SELECT COUNT(*) FROM ({PENDING_SQL})", (generation,)).fetchone()[0]
+        if missing:
+            raise ValueError(f"세대 {generation}에 임베딩이 없는 레시피가 {missing}개 있습니다.")
+        conn.execute(
+            """
+            UPDATE RECIPE_BASE SET EMBEDDING = (
+                SELECT e.EMBEDDING FROM RECIPE_EMBEDDING e
+                WHERE e.GENERATION = ? AND e.RECIPE_ID = RECIPE_BASE.RECIPE_ID
+            )
+            """, (generation,))
+        conn.execute("UPDATE EMBEDDING_GENERATION SET STATUS = ? WHERE STATUS = ?", (RETIRED, ACTIVE))
+        conn.execute(
+            "UPDATE EMBEDDING_GENERATION SET STATUS = ?, ACTIVATED_AT = ? WHERE GENERATION = ?",
+            (ACTIVE, datetime.now(), generation),
+        )
+        conn.execute("DELETE FROM RECIPE_EMBEDDING WHERE GENERATION <> ?", (generation,))
+        db_schema.set_meta(conn, EMBEDDING_MODEL_KEY, model_name)
+        db_schema.bump_catalogue_version(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# --- 재생성 ---
+def rebuild(conn, model_name: str, workers: int, batch_size: int = 256, checkpoint: int = 2048, activate: bool = True) -> int:
+    """
+    model_name으로 카탈로그 전체 임베딩을 새 세대에 계산하고, activate=True이면 완료 후 전환합니다.
+    세대 번호를 반환합니다.
+    """
+    generation = start_generation(conn, model_name)
+    pending = conn.execute(PENDING_SQL, (generation,)).fetchall()
+    done = conn.execute("SELECT COUNT(*) FROM RECIPE_EMBEDDING WHERE GENERATION = ?", (generation,)).fetchone()[0]
+    print(f"Generation {generation} ({model_name}): {done} done, {len(pending)} pending, {workers} workers")
+
+    if pending:
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        started = time.perf_counter()
+        written = 0
+        buffer = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_name, torch_threads)) as pool:
+            # 결과가 메모리에 쌓이지 않도록 동시에 제출하는 배치 수를 워커 수의 2배로 제한합니다.
+            queue = iter(batches)
+            in_flight = {pool.submit(_encode_batch, b) for b in _take(queue, workers * 2)}
+            try:
+                while in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        rows = future.result()
+                        buffer.extend((generation, recipe_id, blob) for recipe_id, blob in rows)
+                        written += len(rows)
+                        if len(buffer) >= checkpoint:
+                            _write_embeddings(conn, buffer)
+                            rate = written / (time.perf_counter() - started)
+                            print(f"  checkpoint: {done + written}/{done + len(pending)} ({rate:.0f} recipes/s)")
+                        in_flight |= {pool.submit(_encode_batch, b) for b in _take(queue, 1)}
+            finally:
+                # 중단되더라도 이미 계산한 결과는 저장하여 다음 실행에서 이어서 진행합니다.
+                _write_embeddings(conn, buffer)
+        print(f"Encoded {written} recipes in {time.perf_counter() - started:.1f}s")
+
+    if activate:
+        activate_generation(conn, generation)
+        print(f"Generation {generation} activated.")
+    return generation
+
+def _write_embeddings(conn, buffer: list):
+    """모아 둔 (GENERATION, RECIPE_ID, EMBEDDING) 행을 한 트랜잭션으로 기록하고 buffer를 비웁니다."""
+    if not buffer:
+        return
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO RECIPE_EMBEDDING (GENERATION, RECIPE_ID, EMBEDDING) VALUES (?, ?, ?)", buffer)
+    buffer.clear()
+
+def _take(iterator, n):
+    """이터레이터에서 최대 n개를 꺼냅니다."""
+    items = []
+    for item in iterator:
+        items.append(item)
+        if len(items) >= n:
+            break
+    return items
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="레시피 임베딩 병렬 재생성")
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("--db", default=None, help="SQLite DB 경로 (기본: RECIPE_DB_FILE)")
+    parser.add_argument("--model", default=None, help="SentenceTransformer 모델 이름 (기본: 현재 활성 모델)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--checkpoint", type=int, default=2048, help="이 행 수마다 커밋합니다.")
+    parser.add_argument("--no-activate", action="store_true", help="계산만 하고 전환하지 않습니다.")
+    args = parser.parse_args(argv)
+
+    db_file = args.db or db_schema.DB_FILE
+    with sqlite3.connect(db_file) as conn:
+        db_schema.create_tables(conn)
+        if args.command == "build":
+            previous_model = db_schema.get_meta(conn, EMBEDDING_MODEL_KEY)
+            model_name = args.model or previous_model or DEFAULT_MODEL_NAME
+            rebuild(conn, model_name, args.workers, args.batch_size, args.checkpoint, activate=not args.no_activate)
+            if not args.no_activate:
+                # 공유 인덱스 모드라면 새 세대를 게시하여 API 워커들이 전환하도록 합니다.
+                if os.getenv("RECIPE_SHARED_INDEX_DIR"):
+                    from shared_index import publish_from_db
+                    publish_from_db(db_file, os.getenv("RECIPE_SHARED_INDEX_DIR"))
+                if previous_model and previous_model != model_name:
+                    # 앱은 active_model_name()으로, API 서버는 연결한 세대의 manifest로 새 모델을 따라갑니다.
+                    print(f"Embedding model changed: {previous_model} -> {model_name}. "
+                          "Running app/API processes load the new query encoder on their next search.")
+        else:
+            print(f"Active model: {db_schema.get_meta(conn, EMBEDDING_MODEL_KEY) or DEFAULT_MODEL_NAME}")
+            total = conn.execute("SELECT COUNT(*) FROM RECIPE_BASE").fetchone()[0]
+            for generation, model_name, status, created_at, activated_at in conn.execute(
+                "SELECT GENERATION, MODEL_NAME, STATUS, CREATED_AT, ACTIVATED_AT FROM EMBEDDING_GENERATION ORDER BY GENERATION"
+            ).fetchall():
+                done = conn.execute("SELECT COUNT(*) FROM RECIPE_EMBEDDING WHERE GENERATION = ?", (generation,)).fetchone()[0]
+                print(f"Generation {generation}: {status:<8} {model_name} {done}/{total} created={created_at} activated={activated_at or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
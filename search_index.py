@@ -0,0 +1,111 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import db_schema
+import perf
+
+
+def _to_code_array(values) -> np.ndarray:
+    """코드/수치 컬럼(문자열/숫자 혼재)을 int64 배열로 변환합니다. 값이 없으면 -1로 채웁니다."""
+    return pd.to_numeric(pd.Series(values), errors="coerce").fillna(-1).astype(np.int64).to_numpy()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """코사인 유사도를 내적으로 계산할 수 있도록 각 행을 L2 정규화합니다."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingIndex:
+    """
+    레시피 임베딩을 정규화된 행렬로 메모리에 올려두고 검색하는 인덱스입니다.
+    search_by_name_bert()와 같은 결과를 DB 조회/BLOB 디코딩 없이 반환합니다.
+    """
+
+    def __init__(self, recipe_ids, names, nation_codes, type_codes, calories, cooking_times, embeddings):
+        # 배열은 복사하지 않고 그대로 보관합니다. (메모리 맵 배열도 그대로 사용 가능)
+        self.recipe_ids = recipe_ids
+        self.names = names
+        self.nation_codes = nation_codes
+        self.type_codes = type_codes
+        self.calories = calories
+        self.cooking_times = cooking_times
+        self.embeddings = embeddings
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        """RECIPE_BASE 형식의 DataFrame(EMBEDDING BLOB 포함)으로 인덱스를 생성합니다."""
+        if df.empty:
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+        else:
+            embeddings = normalize_rows(np.vstack([np.frombuffer(e, dtype=np.float32) for e in df["EMBEDDING"]]))
+        return cls(
+            recipe_ids=df["RECIPE_ID"].to_numpy(dtype=np.int64),
+            names=df["RECIPE_NM_KO"].fillna("").astype(str).to_numpy(dtype=str),
+            nation_codes=_to_code_array(df["NATION_CODE"]),
+            type_codes=_to_code_array(df["TY_CODE"]),
+            calories=_to_code_array(df["CALORIE"]),
+            cooking_times=_to_code_array(df["COOKING_TIME"]),
+            embeddings=embeddings,
+        )
+
+    @classmethod
+    @perf.timed("index.build")
+    def from_db(cls, db_file: str = None):
+        """RECIPE_BASE 테이블의 임베딩을 읽어 인덱스를 생성합니다."""
+        with sqlite3.connect(db_file or db_schema.DB_FILE) as conn:
+            df = pd.read_sql_query(
+                "SELECT RECIPE_ID, RECIPE_NM_KO, NATION_CODE, TY_CODE, CALORIE, COOKING_TIME, EMBEDDING "
+                "FROM RECIPE_BASE WHERE EMBEDDING IS NOT NULL ORDER BY RECIPE_ID",
+                conn,
+            )
+        return cls.from_frame(df)
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def _mask(self, nation_code=None, type_code=None):
+        mask = np.ones(len(self), dtype=bool)
+        if nation_code:
+            mask &= self.nation_codes == int(nation_code)
+        if type_code:
+            mask &= self.type_codes == int(type_code)
+        return mask
+
+    def _top_k(self, scores: np.ndarray, mask: np.ndarray, top_k: int) -> pd.DataFrame:
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return pd.DataFrame()
+        cand_scores = scores[candidates]
+        k = min(top_k, candidates.size)
+        # 전체 정렬 대신 argpartition으로 상위 k개만 고른 뒤 정렬합니다.
+        top = np.argpartition(-cand_scores, k - 1)[:k]
+        top = top[np.argsort(-cand_scores[top], kind="stable")]
+        rows = candidates[top]
+        return pd.DataFrame({
+            "RECIPE_ID": self.recipe_ids[rows],
+            "RECIPE_NM_KO": self.names[rows],
+            "유사도": cand_scores[top],
+        })
+
+    @perf.timed("index.search")
+    def search(self, query_embedding, nation_code=None, type_code=None, top_k: int = 15) -> pd.DataFrame:
+        """쿼리 임베딩 하나에 대해 카테고리 필터를 적용한 상위 top_k개 레시피를 반환합니다."""
+        return self.search_batch([query_embedding], [(nation_code, type_code)], top_k)[0]
+
+    @perf.timed("index.search_batch")
+    def search_batch(self, query_embeddings, filters=None, top_k: int = 15):
+        """
+        여러 쿼리를 한 번의 행렬 곱으로 점수화합니다.
+        filters는 쿼리별 (nation_code, type_code) 튜플 리스트이며, 결과는 DataFrame 리스트입니다.
+        """
+        queries = normalize_rows(np.atleast_2d(query_embeddings))
+        filters = filters or [(None, None)] * len(queries)
+        if len(self) == 0:
+            return [pd.DataFrame() for _ in queries]
+        scores = queries @ self.embeddings.T
+        return [self._top_k(scores[i], self._mask(*filters[i]), top_k) for i in range(len(queries))]
@@ -1,27 +1,48 @@
-import streamlit as st
 import sqlite3
+from functools import lru_cache
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime
 
-from database_setup import DB_FILE
+import db_schema
+import perf
 
-@st.cache_resource
-def load_bert_model():
-    """SentenceTransformer 모델을 로드합니다."""
-    return SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+# 벤치마크/API 서버처럼 Streamlit 없이 임포트하는 경우에는 프로세스 단위 캐시를 사용합니다.
+try:
+    import streamlit as st
+    _cache_resource = st.cache_resource
+except ImportError:
+    _cache_resource = lru_cache(maxsize=None)
+
+DEFAULT_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDING_MODEL_KEY = "embedding_model"
+
+def active_model_name() -> str:
+    """RECIPE_BASE.EMBEDDING을 만든 모델 이름을 반환합니다. (rebuild_embeddings.py가 세대 전환 시 기록)"""
+    try:
+        with sqlite3.connect(db_schema.DB_FILE) as conn:
+            return db_schema.get_meta(conn, EMBEDDING_MODEL_KEY) or DEFAULT_MODEL_NAME
+    except sqlite3.Error:
+        return DEFAULT_MODEL_NAME
+
+@_cache_resource
+def load_bert_model(model_name: str = None):
+    """SentenceTransformer 모델을 로드합니다. 이름을 주지 않으면 현재 임베딩을 만든 모델을 사용합니다."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name or active_model_name())
 
 def db_query(query, params=()):
     """데이터베이스 쿼리를 실행하고 결과를 DataFrame으로 반환합니다."""
-    with sqlite3.connect(DB_FILE) as conn:
+    with perf.trace("db.connect"):
+        conn = sqlite3.connect(db_schema.DB_FILE)
+    with conn, perf.trace("db.query"):
         return pd.read_sql_query(query, conn, params=params)
 
-def search_by_name_bert(query: str, model, nation_code: int = None, type_code: int = None, top_k: int = 15):
-    """
-    AI 검색에 카테고리 필터링 기능을 추가합니다.
-    """
+# --- 핫 쿼리 ---
+# 쿼리 문자열은 migrations.check_query_plans()가 EXPLAIN QUERY PLAN으로 인덱스 사용 여부를 검사할 수 있도록 모아둡니다.
+def build_name_search_query(nation_code: int = None, type_code: int = None):
+    """AI 검색용 후보(임베딩) 조회 쿼리와 파라미터를 반환합니다."""
     sql_query = "SELECT RECIPE_ID, RECIPE_NM_KO, EMBEDDING FROM RECIPE_BASE WHERE EMBEDDING IS NOT NULL"
     params = []
 
@@ -31,16 +52,116 @@ def search_by_name_bert(query: str, model, nation_code: int = None, type_code: i
     if type_code:
         sql_query += " AND TY_CODE = ?"
         params.append(type_code)
+    return sql_query, tuple(params)
 
-    df_base = db_query(sql_query, tuple(params))
+def build_ingredient_search_query(keyword: str, nation_code: int = None, type_code: int = None):
+    """재료 검색 쿼리와 파라미터를 반환합니다."""
+    # LIKE '%키워드%'는 재료명 커버링 인덱스만 훑어 RECIPE_ID를 모은 뒤, 기본 키로 레시피를 조회합니다.
+    sql_query = """
+        SELECT b.RECIPE_ID, b.RECIPE_NM_KO
+        FROM RECIPE_BASE b
+        WHERE b.RECIPE_ID IN (SELECT i.RECIPE_ID FROM RECIPE_INGREDIENT i WHERE i.IRDNT_NM LIKE ?)
+    """
+    params = [f'%{keyword}%']
+
+    if nation_code:
+        sql_query += " AND b.NATION_CODE = ?"
+        params.append(nation_code)
+    if type_code:
+        sql_query += " AND b.TY_CODE = ?"
+        params.append(type_code)
+    return sql_query, tuple(params)
+
+DETAIL_BASE_SQL = """
+    SELECT rb.*, ni.NATION_NM, ti.TY_NM
+    FROM RECIPE_BASE rb
+    LEFT JOIN NATION_INFO ni ON rb.NATION_CODE = ni.NATION_CODE
+    LEFT JOIN TYPE_INFO ti ON rb.TY_CODE = ti.TY_CODE
+    WHERE rb.RECIPE_ID = ?
+"""
+DETAIL_INGREDIENT_SQL = "SELECT IRDNT_NM, IRDNT_CPCTY FROM RECIPE_INGREDIENT WHERE RECIPE_ID = ? ORDER BY IRDNT_SN"
+DETAIL_PROCESS_SQL = "SELECT COOKING_DC FROM RECIPE_PROCESS WHERE RECIPE_ID = ? ORDER BY COOKING_NO"
+
+# app.py 화면에서 사용하는 쿼리
+NATION_OPTIONS_SQL = "SELECT NATION_CODE, NATION_NM FROM NATION_INFO ORDER BY NATION_CODE"
+TYPE_OPTIONS_SQL = "SELECT TY_CODE, TY_NM FROM TYPE_INFO ORDER BY TY_CODE"
+NUTRITION_NAMES_SQL = "SELECT FOOD_NAME FROM NUTRITION_INFO ORDER BY FOOD_NAME"
+# 트렌드 쿼리(전체 기간): 운영 DB의 최근 로그 + 보관된 로그의 일별 집계(*_DAILY)를 합산합니다.
+TREND_TOP_KEYWORDS_SQL = """
+    SELECT SRCH_KEYWORD, SUM(cnt) as count
+    FROM (
+        SELECT SRCH_KEYWORD, COUNT(*) as cnt FROM SEARCH_LOG GROUP BY SRCH_KEYWORD
+        UNION ALL
+        SELECT SRCH_KEYWORD, SUM(SRCH_COUNT) FROM SEARCH_KEYWORD_DAILY GROUP BY SRCH_KEYWORD
+    )
+    GROUP BY SRCH_KEYWORD
+    ORDER BY count DESC LIMIT 10
+"""
+# 로그를 RECIPE_ID 인덱스로 먼저 집계한 뒤 레시피명을 기본 키로 붙입니다. (카탈로그 전체 스캔 방지)
+TREND_TOP_VIEWED_SQL = """
+    SELECT r.RECIPE_NM_KO, v.view_count
+    FROM (
+        SELECT RECIPE_ID, SUM(cnt) as view_count
+        FROM (
+            SELECT RECIPE_ID, COUNT(VIEW_ID) as cnt FROM DWELL_TIME_LOG GROUP BY RECIPE_ID
+            UNION ALL
+            SELECT RECIPE_ID, SUM(VIEW_COUNT) FROM RECIPE_VIEW_DAILY GROUP BY RECIPE_ID
+        )
+        GROUP BY RECIPE_ID
+    ) v
+    JOIN RECIPE_BASE r ON v.RECIPE_ID = r.RECIPE_ID
+    ORDER BY v.view_count DESC LIMIT 10
+"""
+TREND_KEYWORD_DWELL_SQL = """
+    SELECT SRCH_KEYWORD, SUM(dwell_sum) * 1.0 / SUM(dwell_count) as avg_dwell
+    FROM (
+        SELECT s.SRCH_KEYWORD, SUM(d.DWELL_TIME) as dwell_sum, COUNT(d.VIEW_ID) as dwell_count
+        FROM DWELL_TIME_LOG d
+        JOIN SEARCH_LOG s ON d.SRCH_ID = s.SRCH_ID
+        WHERE d.DWELL_TIME IS NOT NULL AND d.DWELL_TIME < 1800 -- 30분 이상은 이상치로 간주
+        GROUP BY s.SRCH_KEYWORD
+        UNION ALL
+        SELECT SRCH_KEYWORD, SUM(DWELL_SUM), SUM(DWELL_COUNT) FROM KEYWORD_DWELL_DAILY GROUP BY SRCH_KEYWORD
+    )
+    GROUP BY SRCH_KEYWORD
+    HAVING SUM(dwell_count) > 2 
+    ORDER BY avg_dwell DESC LIMIT 10
+"""
+# 트렌드 쿼리(기간 지정): 운영 DB에서 기간에 해당하는 로그만 시각 인덱스로 읽고, 집계는 log_retention에서 보관 파티션과 합쳐 합니다.
+TREND_RANGE_KEYWORDS_SQL = "SELECT SRCH_KEYWORD FROM SEARCH_LOG WHERE SRCH_TIME >= ? AND SRCH_TIME < ?"
+TREND_RANGE_VIEWS_SQL = "SELECT RECIPE_ID FROM DWELL_TIME_LOG WHERE START_TIME >= ? AND START_TIME < ?"
+TREND_RANGE_KEYWORD_DWELL_SQL = """
+    SELECT s.SRCH_KEYWORD, d.DWELL_TIME
+    FROM DWELL_TIME_LOG d
+    JOIN SEARCH_LOG s ON d.SRCH_ID = s.SRCH_ID
+    WHERE d.START_TIME >= ? AND d.START_TIME < ?
+"""
+
+def build_recipe_names_query(recipe_ids):
+    """RECIPE_ID 목록의 레시피명 조회 쿼리와 파라미터를 반환합니다."""
+    ids = [int(recipe_id) for recipe_id in recipe_ids]
+    sql_query = f"SELECT RECIPE_ID, RECIPE_NM_KO FROM RECIPE_BASE WHERE RECIPE_ID IN ({', '.join('?' for _ in ids)})"
+    return sql_query, tuple(ids)
+
+SLOW_PERF_LOG_SQL = "SELECT LOG_TIME, RERUN_ID, OP_NM, ELAPSED_MS FROM PERF_LOG ORDER BY PERF_ID DESC LIMIT 100"
+
+@perf.timed("search_by_name_bert")
+def search_by_name_bert(query: str, model, nation_code: int = None, type_code: int = None, top_k: int = 15):
+    """
+    AI 검색에 카테고리 필터링 기능을 추가합니다.
+    """
+    df_base = db_query(*build_name_search_query(nation_code, type_code))
     
     if df_base.empty:
         return pd.DataFrame()
 
     # --- 4. 임베딩 비교 로직 (필터링된 결과 내에서 수행) ---
-    all_embeddings = np.array([np.frombuffer(e, dtype=np.float32) for e in df_base['EMBEDDING']])
-    query_embedding = model.encode([query])[0]
-    sim_scores = cosine_similarity([query_embedding], all_embeddings)[0]
+    with perf.trace("embedding.decode"):
+        all_embeddings = np.array([np.frombuffer(e, dtype=np.float32) for e in df_base['EMBEDDING']])
+    with perf.trace("model.encode"):
+        query_embedding = model.encode([query])[0]
+    with perf.trace("similarity"):
+        sim_scores = cosine_similarity([query_embedding], all_embeddings)[0]
     
     top_indices = sim_scores.argsort()[::-1][:top_k]
     
@@ -49,48 +170,66 @@ def search_by_name_bert(query: str, model, nation_code: int = None, type_code: i
     
     return df_similar.drop(columns=['EMBEDDING'])
 
+@perf.timed("search_by_name_index")
+def search_by_name_index(query: str, model, index, nation_code: int = None, type_code: int = None, top_k: int = 15):
+    """
+    search_by_name_bert()와 같은 검색을 DB 대신 메모리(또는 메모리 맵) 인덱스에서 수행합니다.
+    """
+    with perf.trace("model.encode"):
+        query_embedding = model.encode([query])[0]
+    return index.search(query_embedding, nation_code, type_code, top_k)
+
+@perf.timed("search_by_ingredient")
 def search_by_ingredient(keyword: str, nation_code: int = None, type_code: int = None):
     """
     재료 검색에 카테고리 필터링 기능을 추가합니다.
     """
-    sql_query = """
-        SELECT DISTINCT b.RECIPE_ID, b.RECIPE_NM_KO
-        FROM RECIPE_BASE b
-        JOIN RECIPE_INGREDIENT i ON b.RECIPE_ID = i.RECIPE_ID
-        WHERE i.IRDNT_NM LIKE ?
-    """
-    params = [f'%{keyword}%']
-
-    if nation_code:
-        sql_query += " AND b.NATION_CODE = ?"
-        params.append(nation_code)
-    if type_code:
-        sql_query += " AND b.TY_CODE = ?"
-        params.append(type_code)
-
-    return db_query(sql_query, tuple(params))
+    return db_query(*build_ingredient_search_query(keyword, nation_code, type_code))
 
+@perf.timed("fetch_recipe_detail")
 def fetch_recipe_detail(recipe_id: int):
     """특정 레시피 ID에 해당하는 상세 정보를 DB에서 조회합니다."""
-    with sqlite3.connect(DB_FILE) as conn:
-        base_query = """
-            SELECT rb.*, ni.NATION_NM, ti.TY_NM
-            FROM RECIPE_BASE rb
-            LEFT JOIN NATION_INFO ni ON rb.NATION_CODE = ni.NATION_CODE
-            LEFT JOIN TYPE_INFO ti ON rb.TY_CODE = ti.TY_CODE
-            WHERE rb.RECIPE_ID = ?
-        """
-        base_df = pd.read_sql_query(base_query, conn, params=(recipe_id,))
+    with sqlite3.connect(db_schema.DB_FILE) as conn:
+        base_df = pd.read_sql_query(DETAIL_BASE_SQL, conn, params=(recipe_id,))
         if base_df.empty:
             return None
         base = base_df.to_dict(orient="records")[0]
-        ingredients = pd.read_sql_query("SELECT IRDNT_NM, IRDNT_CPCTY FROM RECIPE_INGREDIENT WHERE RECIPE_ID = ? ORDER BY IRDNT_SN", conn, params=(recipe_id,)).to_dict(orient="records")
-        process = pd.read_sql_query("SELECT COOKING_DC FROM RECIPE_PROCESS WHERE RECIPE_ID = ? ORDER BY COOKING_NO", conn, params=(recipe_id,)).to_dict(orient="records")
+        ingredients = pd.read_sql_query(DETAIL_INGREDIENT_SQL, conn, params=(recipe_id,)).to_dict(orient="records")
+        process = pd.read_sql_query(DETAIL_PROCESS_SQL, conn, params=(recipe_id,)).to_dict(orient="records")
     return {"base": base, "ingredients": ingredients, "process": process}
 
+NUTRIENT_COLUMNS = ['ENERGY', 'PROTEIN', 'FAT', 'CH', 'SUGAR']
+
+@perf.timed("calculate_nutrition")
+def calculate_nutrition(items):
+    """
+    재료 목록([{"name": 식품명, "weight": g}, ...])의 총 영양성분을 계산합니다.
+    NUTRITION_INFO의 값은 100g 기준이므로 무게 비율만큼 곱해서 더합니다.
+    """
+    total_nutrition = {col: 0.0 for col in NUTRIENT_COLUMNS}
+    ingredient_list = [item['name'] for item in items if item.get('name') and item.get('weight', 0) > 0]
+    if not ingredient_list:
+        return total_nutrition
+
+    placeholders = ', '.join('?' for _ in ingredient_list)
+    query = f"SELECT * FROM NUTRITION_INFO WHERE FOOD_NAME IN ({placeholders})"
+    all_nut_info_df = db_query(query, ingredient_list)
+    if all_nut_info_df.empty:
+        return total_nutrition
+
+    all_nut_info_df.set_index('FOOD_NAME', inplace=True)
+    for item in items:
+        if item.get('name') in all_nut_info_df.index and item.get('weight', 0) > 0:
+            info = all_nut_info_df.loc[item['name']]
+            ratio = item['weight'] / 100.0
+            for col in NUTRIENT_COLUMNS:
+                total_nutrition[col] += float(info.get(col, 0)) * ratio
+    return total_nutrition
+
+@perf.timed("log_search")
 def log_search(srch_code: int, keyword: str, nation_code: int = None):
     """검색 기록을 SEARCH_LOG에 저장하고 생성된 SRCH_ID를 반환합니다."""
-    with sqlite3.connect(DB_FILE) as conn:
+    with sqlite3.connect(db_schema.DB_FILE) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO SEARCH_LOG (SRCH_CODE, SRCH_KEYWORD, NATION_CODE, SRCH_TIME) VALUES (?, ?, ?, ?)",
@@ -98,24 +237,26 @@ def log_search(srch_code: int, keyword: str, nation_code: int = None):
         )
         return cursor.lastrowid
 
+@perf.timed("log_recommendations")
 def log_recommendations(srch_id: int, results_df: pd.DataFrame):
     """추천된 레시피 목록을 RECOMMEND_LOG에 저장합니다."""
     if 'RECIPE_ID' not in results_df.columns:
         return
-    with sqlite3.connect(DB_FILE) as conn:
+    with sqlite3.connect(db_schema.DB_FILE) as conn:
         for recipe_id in results_df['RECIPE_ID']:
             conn.execute(
                 "INSERT INTO RECOMMEND_LOG (SRCH_ID, RECIPE_ID) VALUES (?, ?)",
                 (srch_id, int(recipe_id))
             )
 
+@perf.timed("log_dwell_time")
 def log_dwell_time(session_state):
     """레시피 상세 페이지 체류 시간을 DWELL_TIME_LOG에 저장합니다."""
     if 'view_start_time' in session_state and session_state.view_start_time:
         view_info = session_state.view_start_time
         dwell_seconds = (datetime.now() - view_info['time']).total_seconds()
         if dwell_seconds > 3:
-            with sqlite3.connect(DB_FILE) as conn:
+            with sqlite3.connect(db_schema.DB_FILE) as conn:
                 conn.execute(
                     "INSERT INTO DWELL_TIME_LOG (SRCH_ID, RECIPE_ID, START_TIME, DWELL_TIME) VALUES (?, ?, ?, ?)",
                     (view_info['srch_id'], view_info['recipe_id'], view_info['time'], int(dwell_seconds))
@@ -0,0 +1,193 @@
+"""
+여러 워커 프로세스가 하나의 임베딩 행렬을 공유하기 위한 메모리 맵 인덱스 저장소입니다.
+
+인덱스 배열(정규화된 임베딩, RECIPE_ID, 이름, NATION_CODE, TY_CODE, CALORIE, COOKING_TIME)을
+세대(generation) 디렉터리에 snapshot.py 형식(manifest.json + .npy 파일)으로 저장하고, 각 프로세스는 np.load(mmap_mode='r')로
+복사 없이 읽기 전용으로 연결합니다. 같은 파일을 여러 프로세스가 매핑하므로 물리 메모리는 OS 페이지 캐시 한 벌만 사용합니다.
+
+새 세대는 임시 디렉터리에 모두 쓴 뒤 이름을 바꾸고, 마지막에 CURRENT 포인터 파일을 os.replace로
+교체하여 원자적으로 전환합니다. 읽는 쪽(SharedIndexReader)은 CURRENT가 바뀌면 새 세대로 다시 연결합니다.
+
+사용 예:
+    python shared_index.py publish            # DB에서 인덱스를 만들어 새 세대로 게시
+    python shared_index.py info               # 현재 세대 정보 출력
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import uuid
+
+import db_schema
+import perf
+from search_index import EmbeddingIndex
+from search_logic import EMBEDDING_MODEL_KEY, DEFAULT_MODEL_NAME
+from snapshot import (
+    INDEX_FIELDS, SnapshotError, build_arrays, check_model, db_generation, file_lock, open_snapshot, read_manifest, write_snapshot
+)
+
+DEFAULT_INDEX_DIR = os.getenv("RECIPE_SHARED_INDEX_DIR", os.path.join("data", "index"))
+CURRENT_FILE = "CURRENT"
+PUBLISH_LOCK_FILE = ".publish.lock"
+ARRAY_FIELDS = INDEX_FIELDS
+KEEP_GENERATIONS = 2
+
+
+def current_generation(base_dir: str = DEFAULT_INDEX_DIR):
+    """CURRENT 파일이 가리키는 세대 이름을 반환합니다. 게시된 세대가 없으면 None."""
+    try:
+        with open(os.path.join(base_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _generations(base_dir: str):
+    if not os.path.isdir(base_dir):
+        return []
+    return sorted(d for d in os.listdir(base_dir) if d.startswith("gen-") and ".tmp" not in d)
+
+
+@perf.timed("shared_index.publish")
+def publish(index, base_dir: str = DEFAULT_INDEX_DIR, source: str = None, db_generation: str = None, model_name: str = None) -> str:
+    """
+    인덱스(EmbeddingIndex 또는 snapshot.build_arrays()의 배열 dict)를 새 세대로 저장하고
+    CURRENT를 원자적으로 교체한 뒤 세대 이름을 반환합니다.
+    """
+    arrays = {field: getattr(index, field) for field in ARRAY_FIELDS} if isinstance(index, EmbeddingIndex) else index
+    os.makedirs(base_dir, exist_ok=True)
+    # 세대 번호 결정부터 CURRENT 교체까지 잠금을 잡아 동시에 게시하는 프로세스가 같은 gen-N을 쓰지 않도록 합니다.
+    with file_lock(os.path.join(base_dir, PUBLISH_LOCK_FILE)):
+        return _publish(arrays, base_dir, source, db_generation, model_name)
+
+def _publish(arrays: dict, base_dir: str, source: str, db_generation: str, model_name: str) -> str:
+    """publish()의 본체입니다. 호출한 쪽에서 게시 잠금을 잡고 있어야 합니다."""
+    existing = _generations(base_dir)
+    next_no = int(existing[-1].split("-")[1]) + 1 if existing else 1
+    generation = f"gen-{next_no:06d}"
+
+    tmp_dir = os.path.join(base_dir, f"{generation}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    try:
+        write_snapshot(arrays, tmp_dir, db_generation, index_generation=generation, source=source, model_name=model_name)
+        os.rename(tmp_dir, os.path.join(base_dir, generation))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    pointer_tmp = os.path.join(base_dir, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(base_dir, CURRENT_FILE))
+
+    # 이미 매핑 중인 프로세스는 파일이 삭제되어도 기존 매핑을 계속 사용할 수 있습니다. (POSIX)
+    for old in _generations(base_dir)[:-KEEP_GENERATIONS]:
+        shutil.rmtree(os.path.join(base_dir, old), ignore_errors=True)
+    return generation
+
+
+def _db_arrays(db_file: str = None):
+    """DB로 게시할 배열(임베딩 인덱스 + 재료 역색인 + 영양성분 행렬)과 DB 세대/모델 이름을 만듭니다."""
+    with sqlite3.connect(db_file or db_schema.DB_FILE) as conn:
+        generation = db_generation(conn)
+        model_name = db_schema.get_meta(conn, EMBEDDING_MODEL_KEY, DEFAULT_MODEL_NAME)
+    return build_arrays(db_file), {"source": db_file, "db_generation": generation, "model_name": model_name}
+
+def publish_from_db(db_file: str = None, base_dir: str = DEFAULT_INDEX_DIR) -> str:
+    """DB로 스냅샷 배열(임베딩 인덱스 + 재료 역색인 + 영양성분 행렬)을 만들어 새 세대로 게시합니다."""
+    arrays, meta = _db_arrays(db_file)
+    return publish(arrays, base_dir, **meta)
+
+def ensure_published(db_file: str = None, base_dir: str = DEFAULT_INDEX_DIR) -> str:
+    """
+    게시된 세대가 없으면 DB로 첫 세대를 게시하고 현재 세대 이름을 반환합니다.
+    게시 잠금을 잡은 뒤 다시 확인하므로 여러 프로세스가 동시에 시작해도 한 번만 게시합니다.
+    """
+    generation = current_generation(base_dir)
+    if generation is not None:
+        return generation
+    os.makedirs(base_dir, exist_ok=True)
+    with file_lock(os.path.join(base_dir, PUBLISH_LOCK_FILE)):
+        generation = current_generation(base_dir)
+        if generation is None:
+            arrays, meta = _db_arrays(db_file)
+            generation = _publish(arrays, base_dir, **meta)
+            print(f"Shared index: published first generation {generation} to {base_dir}")
+    return generation
+
+
+@perf.timed("shared_index.attach")
+def attach(base_dir: str = DEFAULT_INDEX_DIR, generation: str = None) -> EmbeddingIndex:
+    """현재(또는 지정한) 세대의 배열을 읽기 전용 메모리 맵으로 연결하여 인덱스를 반환합니다."""
+    generation = generation or current_generation(base_dir)
+    if generation is None:
+        raise FileNotFoundError(f"'{base_dir}'에 게시된 인덱스 세대가 없습니다. 'python shared_index.py publish'를 먼저 실행하세요.")
+    index = open_snapshot(os.path.join(base_dir, generation)).index
+    index.generation = generation
+    return index
+
+
+class SharedIndexReader:
+    """
+    게시된 인덱스를 연결해두고, CURRENT가 바뀌면 새 세대로 갈아끼우는 읽기 전용 핸들입니다.
+    CURRENT 확인은 check_interval초에 한 번만 하므로 요청마다 호출해도 부담이 없습니다.
+    model_name을 주면 그 모델로 만든 세대만 사용합니다. 처음 연결한 세대의 모델이 다르면 SnapshotError를 발생시키고,
+    이후 게시된 세대의 모델이 다르면 이전 세대를 계속 사용합니다. (쿼리 인코딩 모델과 맞지 않는 벡터로 검색하지 않도록)
+    """
+
+    def __init__(self, base_dir: str = DEFAULT_INDEX_DIR, check_interval: float = 2.0, model_name: str = None):
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self.model_name = model_name
+        self._index = attach(base_dir)
+        check_model(getattr(self._index, "model_name", None), model_name)
+        self._checked_at = time.monotonic()
+        self._skipped = None
+
+    @property
+    def generation(self):
+        return self._index.generation
+
+    def get(self) -> EmbeddingIndex:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            latest = current_generation(self.base_dir)
+            if latest and latest != self._index.generation and latest != self._skipped:
+                index = attach(self.base_dir, latest)
+                try:
+                    check_model(getattr(index, "model_name", None), self.model_name)
+                except SnapshotError as e:
+                    print(f"Warning: 공유 인덱스 {latest}로 전환하지 않고 {self._index.generation}을 계속 사용합니다: {e}")
+                    self._skipped = latest
+                else:
+                    # 참조 교체는 원자적이므로 진행 중인 검색은 이전 세대를 끝까지 사용합니다.
+                    self._index = index
+        return self._index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="공유 메모리 맵 인덱스 관리")
+    parser.add_argument("command", choices=["publish", "info"])
+    parser.add_argument("--db", default=None, help="원본 SQLite DB 경로 (기본: RECIPE_DB_FILE)")
+    parser.add_argument("--dir", default=DEFAULT_INDEX_DIR, help="인덱스 저장 디렉터리")
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        generation = publish_from_db(args.db, args.dir)
+        print(f"Published {generation} to {args.dir}")
+    else:
+        generation = current_generation(args.dir)
+        if generation is None:
+            print(f"No generation published in {args.dir}")
+            return 1
+        manifest = read_manifest(os.path.join(args.dir, generation))
+        print(json.dumps({k: v for k, v in manifest.items() if k != "arrays"}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+검색용 자료구조를 미리 만들어 두는 스냅샷 파일 형식입니다.
+
+앱/API 프로세스가 시작할 때마다 DB의 임베딩 BLOB을 디코딩하고 정규화하는 대신,
+한 번 만든 스냅샷 디렉터리를 np.load(mmap_mode='r')로 복사 없이 연결합니다.
+
+디렉터리 구성:
+    manifest.json           형식 이름/버전, DB 세대, 모델 이름, 배열별 dtype/shape/sha256
+    embeddings.npy          L2 정규화된 임베딩 행렬 (float32, N x dim)
+    recipe_ids.npy, names.npy, nation_codes.npy, type_codes.npy, calories.npy, cooking_times.npy
+    ingredient_names.npy    재료명 (정렬된 고유 값)
+    ingredient_indptr.npy   재료명별 게시 목록 시작 위치 (CSR, 길이 = 재료 수 + 1)
+    ingredient_postings.npy 레시피 행 번호 (int32)
+    nutrition_names.npy     NUTRITION_INFO.FOOD_NAME
+    nutrition_matrix.npy    100g 기준 영양성분 (float32, 식품 수 x NUTRIENT_COLUMNS)
+
+manifest의 db_generation이 현재 DB의 db_generation()과 다르면 스냅샷을 쓰지 않습니다.
+(카탈로그를 바꾸는 적재/임베딩 재생성/칼로리 예측은 db_schema.bump_catalogue_version()을 호출합니다)
+
+사용 예:
+    python snapshot.py build                # DB로 스냅샷 생성 (기본: data/snapshot)
+    python snapshot.py verify               # 형식/체크섬/DB 세대 검사 (실패 시 종료 코드 1)
+    python snapshot.py info                 # manifest 출력
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import db_schema
+import perf
+from search_index import EmbeddingIndex
+from search_logic import NUTRIENT_COLUMNS, EMBEDDING_MODEL_KEY, DEFAULT_MODEL_NAME
+
+FORMAT_NAME = "recipe-search-snapshot"
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+DEFAULT_SNAPSHOT_DIR = os.getenv("RECIPE_SNAPSHOT_DIR", os.path.join("data", "snapshot"))
+
+INDEX_FIELDS = ["recipe_ids", "names", "nation_codes", "type_codes", "calories", "cooking_times", "embeddings"]
+INGREDIENT_FIELDS = ["ingredient_names", "ingredient_indptr", "ingredient_postings"]
+NUTRITION_FIELDS = ["nutrition_names", "nutrition_matrix"]
+
+
+class SnapshotError(Exception):
+    """스냅샷이 없거나, 형식/버전/체크섬/DB 세대가 맞지 않을 때 발생합니다."""
+
+
+# --- DB 세대 ---
+def db_generation(conn) -> str:
+    """
+    스냅샷과 DB가 같은 내용인지 판단하는 문자열입니다.
+    카탈로그 버전에 행 수/최대 ID/임베딩 모델을 더해, 버전을 올리지 않은 수동 변경도 대부분 잡아냅니다.
+    """
+    version = db_schema.get_meta(conn, db_schema.CATALOGUE_VERSION_KEY, "0")
+    stats = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM RECIPE_BASE), (SELECT MAX(RECIPE_ID) FROM RECIPE_BASE), "
+        "(SELECT COUNT(*) FROM RECIPE_INGREDIENT), (SELECT COUNT(*) FROM NUTRITION_INFO)"
+    ).fetchone()
+    model_name = db_schema.get_meta(conn, EMBEDDING_MODEL_KEY, DEFAULT_MODEL_NAME)
+    digest = hashlib.sha1(json.dumps([version, list(stats), model_name]).encode("utf-8")).hexdigest()[:12]
+    return f"{version}-{digest}"
+
+
+# --- 생성 ---
+def _ingredient_csr(recipe_ids: np.ndarray, ingredients: pd.DataFrame):
+    """(RECIPE_ID, IRDNT_NM) 목록을 재료명 -> 레시피 행 번호 CSR 역색인으로 변환합니다."""
+    row_of = pd.Series(np.arange(len(recipe_ids), dtype=np.int32), index=recipe_ids)
+    df = ingredients.assign(ROW=ingredients["RECIPE_ID"].map(row_of)).dropna(subset=["ROW", "IRDNT_NM"])
+    df = df.assign(IRDNT_NM=df["IRDNT_NM"].astype(str).str.strip(), ROW=df["ROW"].astype(np.int32))
+    df = df.drop_duplicates(["IRDNT_NM", "ROW"]).sort_values(["IRDNT_NM", "ROW"])
+    names, counts = np.unique(df["IRDNT_NM"].to_numpy(dtype=str), return_counts=True)
+    indptr = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return names, indptr, df["ROW"].to_numpy(dtype=np.int32)
+
+@perf.timed("snapshot.build_arrays")
+def build_arrays(db_file: str = None) -> dict:
+    """DB에서 스냅샷에 들어갈 배열을 모두 만듭니다."""
+    index = EmbeddingIndex.from_db(db_file)
+    arrays = {field: np.ascontiguousarray(getattr(index, field)) for field in INDEX_FIELDS}
+    with sqlite3.connect(db_file or db_schema.DB_FILE) as conn:
+        ingredients = pd.read_sql_query("SELECT RECIPE_ID, IRDNT_NM FROM RECIPE_INGREDIENT", conn)
+        nutrition = pd.read_sql_query(f"SELECT FOOD_NAME, {', '.join(NUTRIENT_COLUMNS)} FROM NUTRITION_INFO ORDER BY FOOD_NAME", conn)
+    arrays.update(zip(INGREDIENT_FIELDS, _ingredient_csr(arrays["recipe_ids"], ingredients)))
+    arrays["nutrition_names"] = nutrition["FOOD_NAME"].astype(str).to_numpy(dtype=str)
+    arrays["nutrition_matrix"] = np.ascontiguousarray(
+        nutrition[NUTRIENT_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=np.float32)
+    )
+    return arrays
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_snapshot(arrays: dict, out_dir: str, generation: str = None, **meta) -> dict:
+    """arrays를 out_dir(비어 있는 새 디렉터리)에 .npy 파일과 manifest.json으로 저장하고 manifest를 반환합니다."""
+    os.makedirs(out_dir)
+    entries = {}
+    for name, array in arrays.items():
+        path = os.path.join(out_dir, f"{name}.npy")
+        np.save(path, np.ascontiguousarray(array))
+        entries[name] = {"file": f"{name}.npy", "dtype": array.dtype.str, "shape": list(array.shape), "sha256": _sha256(path)}
+    embeddings = arrays.get("embeddings")
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "db_generation": generation,
+        "count": int(len(arrays["recipe_ids"])) if "recipe_ids" in arrays else 0,
+        "dim": int(embeddings.shape[1]) if embeddings is not None and embeddings.ndim == 2 else 0,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **meta,
+        "arrays": entries,
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    return manifest
+
+@contextmanager
+def file_lock(path: str):
+    """
+    path 잠금 파일에 배타적 잠금을 잡습니다. 같은 디렉터리를 만드는 프로세스끼리 순서를 맞출 때 사용합니다.
+    POSIX는 fcntl.flock, Windows는 msvcrt.locking을 사용하며, 둘 다 없으면 잠금 없이 진행합니다.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a+") as f:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            return
+        try:
+            import msvcrt
+        except ImportError:
+            yield
+            return
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # 약 10초 동안 재시도한 뒤 OSError
+                break
+            except OSError:
+                continue
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _unique_suffix() -> str:
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+def _build_snapshot(db_file: str, snapshot_dir: str) -> dict:
+    """build_snapshot()의 본체입니다. 호출한 쪽에서 snapshot_dir 잠금을 잡고 있어야 합니다."""
+    db_file = db_file or db_schema.DB_FILE
+    with sqlite3.connect(db_file) as conn:
+        generation = db_generation(conn)
+        model_name = db_schema.get_meta(conn, EMBEDDING_MODEL_KEY, DEFAULT_MODEL_NAME)
+    arrays = build_arrays(db_file)
+
+    # 임시/이전 디렉터리 이름은 프로세스마다 달라 잠금 밖에서 남은 찌꺼기와도 부딪히지 않습니다.
+    suffix = _unique_suffix()
+    tmp_dir, old_dir = f"{snapshot_dir}.tmp-{suffix}", f"{snapshot_dir}.old-{suffix}"
+    try:
+        manifest = write_snapshot(arrays, tmp_dir, generation, model_name=model_name, source=db_file)
+        if os.path.exists(snapshot_dir):
+            os.rename(snapshot_dir, old_dir)
+        os.rename(tmp_dir, snapshot_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    # 이미 매핑 중인 프로세스는 파일이 삭제되어도 기존 매핑을 계속 사용할 수 있습니다. (POSIX)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+@perf.timed("snapshot.build")
+def build_snapshot(db_file: str = None, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> dict:
+    """
+    DB로 스냅샷을 만들어 snapshot_dir을 교체합니다. 임시 디렉터리에 모두 쓴 뒤 이름을 바꾸므로
+    중간에 실패해도 기존 스냅샷은 그대로 남습니다. 생성 중에는 '<snapshot_dir>.lock'을 잠급니다.
+    """
+    snapshot_dir = os.path.abspath(snapshot_dir)
+    with file_lock(snapshot_dir + ".lock"):
+        return _build_snapshot(db_file, snapshot_dir)
+
+
+# --- 읽기/검증 ---
+def read_manifest(snapshot_dir: str) -> dict:
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"'{snapshot_dir}'에 스냅샷이 없습니다. 'python snapshot.py build'를 먼저 실행하세요.")
+    if manifest.get("format") != FORMAT_NAME or manifest.get("version") != FORMAT_VERSION:
+        raise SnapshotError(f"지원하지 않는 스냅샷 형식입니다: {manifest.get('format')} v{manifest.get('version')}")
+    return manifest
+
+def verify_snapshot(snapshot_dir: str, checksums: bool = True):
+    """파일 존재/dtype/shape(및 checksums=True이면 sha256)를 검사하여 문제 목록을 반환합니다."""
+    manifest = read_manifest(snapshot_dir)
+    problems = []
+    for name, entry in manifest["arrays"].items():
+        path = os.path.join(snapshot_dir, entry["file"])
+        if not os.path.exists(path):
+            problems.append(f"{name}: 파일 없음")
+            continue
+        array = np.load(path, mmap_mode="r")
+        if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+            problems.append(f"{name}: dtype/shape 불일치 ({array.dtype.str} {list(array.shape)})")
+        elif checksums and _sha256(path) != entry["sha256"]:
+            problems.append(f"{name}: 체크섬 불일치")
+    return problems
+
+@perf.timed("snapshot.open")
+def open_snapshot(snapshot_dir: str = DEFAULT_SNAPSHOT_DIR, expected_generation: str = None, checksums: bool = False):
+    """
+    스냅샷의 배열을 읽기 전용 메모리 맵으로 연결합니다. expected_generation이 manifest와 다르거나
+    검사에 실패하면 SnapshotError를 발생시킵니다. (체크섬 검사는 파일 전체를 읽으므로 기본값은 끔)
+    """
+    manifest = read_manifest(snapshot_dir)
+    if expected_generation is not None and manifest.get("db_generation") != expected_generation:
+        raise SnapshotError(f"DB 세대가 다릅니다: 스냅샷 {manifest.get('db_generation')}, DB {expected_generation}")
+    problems = verify_snapshot(snapshot_dir, checksums=checksums)
+    if problems:
+        raise SnapshotError("; ".join(problems))
+    arrays = {name: np.load(os.path.join(snapshot_dir, entry["file"]), mmap_mode="r")
+              for name, entry in manifest["arrays"].items()}
+    return RecipeSnapshot(arrays, manifest)
+
+def current_db_generation(db_file: str = None) -> str:
+    """db_file의 현재 DB 세대를 반환합니다."""
+    with sqlite3.connect(db_file or db_schema.DB_FILE) as conn:
+        return db_generation(conn)
+
+def check_model(model_name, expected_model: str = None):
+    """
+    임베딩을 만든 모델(model_name)이 쿼리를 인코딩할 모델(expected_model)과 다르면 SnapshotError를 발생시킵니다.
+    모델이 다르면 차원이 같아도 검색 결과가 틀리고, 차원이 다르면 행렬 곱에서 오류가 납니다. (기록이 없으면 검사하지 않음)
+    """
+    if expected_model and model_name and model_name != expected_model:
+        raise SnapshotError(f"임베딩 모델({model_name})이 쿼리 인코딩 모델({expected_model})과 다릅니다.")
+
+def load_or_build(db_file: str = None, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR, model_name: str = None):
+    """
+    현재 DB 세대와 맞는 스냅샷이 있으면 연결하고, 없으면 새로 만든 뒤 연결합니다.
+    여러 프로세스가 동시에 시작해도 잠금을 잡은 뒤 다시 확인하므로 한 프로세스만 생성합니다.
+    model_name을 주면 스냅샷의 임베딩 모델이 같은지 확인합니다. (다르면 SnapshotError)
+    """
+    snapshot = _open_or_build(db_file, snapshot_dir)
+    check_model(snapshot.model_name, model_name)
+    return snapshot
+
+def _open_or_build(db_file: str, snapshot_dir: str):
+    generation = current_db_generation(db_file)
+    try:
+        return open_snapshot(snapshot_dir, generation)
+    except (SnapshotError, OSError, ValueError):
+        # 없거나 오래된 스냅샷, 또는 다른 프로세스가 교체하는 도중이라 읽지 못한 경우입니다.
+        pass
+    snapshot_dir = os.path.abspath(snapshot_dir)
+    with file_lock(snapshot_dir + ".lock"):
+        try:
+            return open_snapshot(snapshot_dir, generation)
+        except (SnapshotError, OSError, ValueError) as e:
+            print(f"Snapshot: rebuilding ({e})")
+        with perf.trace("snapshot.build"):
+            _build_snapshot(db_file, snapshot_dir)
+        return open_snapshot(snapshot_dir, generation)
+
+class RecipeSnapshot:
+    """
+    메모리 맵으로 연결된 스냅샷입니다. 이름 검색은 index(EmbeddingIndex)를, 재료 검색과 영양성분 계산은
+    search_ingredient()/calculate_nutrition()을 사용하며 결과 형식은 search_logic의 같은 이름 함수와 같습니다.
+    """
+
+    def __init__(self, arrays: dict, manifest: dict):
+        self.manifest = manifest
+        self.generation = manifest.get("db_generation")
+        self.index = EmbeddingIndex(**{field: arrays[field] for field in INDEX_FIELDS})
+        self.model_name = manifest.get("model_name")
+        self.index.generation = self.generation
+        self.index.model_name = self.model_name
+        self._ingredient_names = arrays.get("ingredient_names")
+        # 대소문자 무시 비교용 사본 (재료명 수만큼의 작은 배열)
+        self._ingredient_names_lower = None if self._ingredient_names is None else np.char.lower(self._ingredient_names)
+        self._ingredient_indptr = arrays.get("ingredient_indptr")
+        self._ingredient_postings = arrays.get("ingredient_postings")
+        nutrition_names = arrays.get("nutrition_names")
+        self._nutrition_matrix = arrays.get("nutrition_matrix")
+        self._nutrition_row = {} if nutrition_names is None else {name: i for i, name in enumerate(nutrition_names.tolist())}
+
+    @property
+    def has_ingredients(self) -> bool:
+        return self._ingredient_names is not None
+
+    @perf.timed("snapshot.search_ingredient")
+    def search_ingredient(self, keyword: str, nation_code: int = None, type_code: int = None) -> pd.DataFrame:
+        """재료명에 keyword가 포함된 레시피를 RECIPE_ID 순으로 반환합니다. (SQL LIKE '%keyword%'와 같이 대소문자 무시)"""
+        matched = np.flatnonzero(np.char.find(self._ingredient_names_lower, str(keyword).lower()) >= 0)
+        rows = np.zeros(len(self.index), dtype=bool)
+        for i in matched:
+            rows[self._ingredient_postings[self._ingredient_indptr[i]:self._ingredient_indptr[i + 1]]] = True
+        rows &= self.index._mask(nation_code, type_code)
+        rows = np.flatnonzero(rows)
+        return pd.DataFrame({"RECIPE_ID": self.index.recipe_ids[rows], "RECIPE_NM_KO": self.index.names[rows]})
+
+    @perf.timed("snapshot.calculate_nutrition")
+    def calculate_nutrition(self, items):
+        """재료 목록([{"name": 식품명, "weight": g}, ...])의 총 영양성분을 100g 기준 행렬로 계산합니다."""
+        totals = np.zeros(len(NUTRIENT_COLUMNS), dtype=np.float64)
+        for item in items:
+            row = self._nutrition_row.get(item.get("name"))
+            if row is not None and item.get("weight", 0) > 0:
+                totals += self._nutrition_matrix[row] * (item["weight"] / 100.0)
+        return {col: float(value) for col, value in zip(NUTRIENT_COLUMNS, totals)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="검색 스냅샷 생성/검증")
+    parser.add_argument("command", choices=["build", "verify", "info"])
+    parser.add_argument("--db", default=None, help="원본 SQLite DB 경로 (기본: RECIPE_DB_FILE)")
+    parser.add_argument("--dir", default=DEFAULT_SNAPSHOT_DIR, help="스냅샷 디렉터리")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "build":
+            manifest = build_snapshot(args.db, args.dir)
+            print(f"Built snapshot {manifest['db_generation']} ({manifest['count']} recipes) in {args.dir}")
+        elif args.command == "verify":
+            problems = verify_snapshot(args.dir)
+            generation = current_db_generation(args.db)
+            manifest = read_manifest(args.dir)
+            if manifest["db_generation"] != generation:
+                problems.append(f"DB 세대 불일치: 스냅샷 {manifest['db_generation']}, DB {generation}")
+            for problem in problems:
+                print(f"FAIL {problem}")
+            print("OK: snapshot matches the database." if not problems else f"{len(problems)} problem(s) found.")
+            return 1 if problems else 0
+        else:
+            manifest = read_manifest(args.dir)
+            print(json.dumps({k: v for k, v in manifest.items() if k != "arrays"}, ensure_ascii=False, indent=2))
+            for name, entry in manifest["arrays"].items():
+                print(f"  {name:<20} {entry['dtype']:<6} {entry['shape']}")
+    except SnapshotError as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
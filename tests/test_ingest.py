@@ -0,0 +1,29 @@
+import sqlite3
+
+import pandas as pd
+
+import db_schema
+import ingest
+
+
+def test_duplicate_step_numbers_across_pages_are_kept(monkeypatch):
+    steps = pd.DataFrame([
+        ("7", "1", "p"), ("7", "3", "q"),
+        ("316", "1", "x1"), ("316", "2", "y"), ("316", "1", "x2"),  # 페이지 경계에 걸친 레시피
+        ("317", "1", "z"),
+    ], columns=["RECIPE_ID", "COOKING_NO", "COOKING_DC"])
+    monkeypatch.setattr(ingest, "fetch_basic_list", lambda start, end: pd.DataFrame())
+    monkeypatch.setattr(ingest, "fetch_ingr_list", lambda start, end: pd.DataFrame())
+    monkeypatch.setattr(ingest, "fetch_prc_list", lambda start, end: steps.iloc[start - 1:end])
+    conn = sqlite3.connect(":memory:")
+    db_schema.create_tables(conn)
+
+    counts = ingest.ingest_catalogue(conn, None, basic_total=0, ingr_total=0, prc_total=len(steps), step=4)
+
+    assert counts["RECIPE_PROCESS"] == len(steps)
+    assert conn.execute("SELECT RECIPE_ID, COOKING_NO, COOKING_DC FROM RECIPE_PROCESS ORDER BY 1, 2").fetchall() == [
+        (7, 1, "p"), (7, 3, "q"),
+        (316, 1, "x1"), (316, 2, "x2"), (316, 3, "y"),
+        (317, 1, "z"),
+    ]
+    assert db_schema.get_meta(conn, ingest.CATALOGUE_STATE_KEY) == "done"
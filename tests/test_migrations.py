@@ -0,0 +1,37 @@
+import sqlite3
+
+import pytest
+
+from migrations import migrate, schema_version
+
+
+def _old_style_table(conn, table, columns, rows):
+    """to_sql(if_exists='replace')로 만든 것처럼 PK/FK 없이 테이블을 만듭니다."""
+    conn.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+    conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' for _ in columns)})", rows)
+    conn.commit()
+
+
+def test_duplicate_process_steps_are_renumbered():
+    conn = sqlite3.connect(":memory:")
+    _old_style_table(conn, "RECIPE_PROCESS", ["RECIPE_ID", "COOKING_NO", "COOKING_DC"], [
+        (176, 1, "a"), (176, 2, "b"), (176, 3, "c1"), (176, 3, "c2"), (176, 5, "e"),
+        (316, 1, "x1"), (316, 1, "x2"), (316, 2, "y"),
+        (7, 1, "p"), (7, 3, "q"),
+    ])
+    migrate(conn)
+    rows = conn.execute("SELECT RECIPE_ID, COOKING_NO, COOKING_DC FROM RECIPE_PROCESS ORDER BY RECIPE_ID, COOKING_NO").fetchall()
+    assert rows == [
+        (7, 1, "p"), (7, 3, "q"),  # 겹치지 않는 레시피의 번호는 그대로 둡니다.
+        (176, 1, "a"), (176, 2, "b"), (176, 3, "c1"), (176, 4, "c2"), (176, 5, "e"),
+        (316, 1, "x1"), (316, 2, "x2"), (316, 3, "y"),
+    ]
+
+
+def test_duplicate_keys_in_other_tables_stop_migration():
+    conn = sqlite3.connect(":memory:")
+    _old_style_table(conn, "RECIPE_BASE", ["RECIPE_ID", "RECIPE_NM_KO"], [(1, "김치찌개"), (1, "된장찌개"), (2, "비빔밥")])
+    with pytest.raises(ValueError, match=r"\(1,\) x2"):
+        migrate(conn)
+    assert schema_version(conn) == 0
+    assert conn.execute("SELECT COUNT(*) FROM RECIPE_BASE").fetchone()[0] == 3
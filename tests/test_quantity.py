@@ -0,0 +1,68 @@
+import math
+
+import pandas as pd
+import pytest
+
+from quantity import Quantity, parse_quantity, quantities_to_grams, to_grams
+
+
+@pytest.mark.parametrize("text, expected", [
+    # 모듈 docstring의 예시
+    ("1/2컵", Quantity(0.5, "컵")),
+    ("1과 1/2큰술", Quantity(1.5, "큰술")),
+    ("1~2개", Quantity(1.5, "개")),
+    ("½작은술", Quantity(0.5, "작은술")),
+    ("200g", Quantity(200.0, "g")),
+    ("반모", Quantity(0.5, "모")),
+    ("한줌", Quantity(1.0, "줌")),
+    ("1컵(200g)", Quantity(200.0, "g")),
+    # 한글 수사는 단위 앞에서만 숫자로 바꿉니다.
+    ("두 큰술", Quantity(2.0, "큰술")),
+    ("반개씩", Quantity(0.5, "개")),
+    ("두부 1모", Quantity(1.0, "모")),
+    ("세송이버섯 2개", Quantity(2.0, "개")),
+    # 천 단위 구분 쉼표
+    ("1,000g", Quantity(1000.0, "g")),
+    ("1,500ml", Quantity(1500.0, "ml")),
+    # 단위 표기 통일/수량 없는 표현
+    ("3 T", Quantity(3.0, "큰술")),
+    ("1tsp", Quantity(1.0, "작은술")),
+    ("중 2개", Quantity(2.0, "개")),
+    ("약간", Quantity(1.0, "약간")),
+    ("적당량", Quantity(1.0, "적당량")),
+    ("", Quantity(None, None)),
+    (None, Quantity(None, None)),
+])
+def test_parse_quantity(text, expected):
+    assert parse_quantity(text) == expected
+
+
+@pytest.mark.parametrize("text, ingredient, grams", [
+    ("15마리", "국물용멸치", 45.0),
+    ("15마리", "중새우", 300.0),
+    ("1마리", "닭", 300.0),
+    ("1,000g", "소고기", 1000.0),
+    ("2개", "달걀", 100.0),
+    ("1큰술", "간장", 18.0),
+    ("50", "소금", 50.0),
+    # 여러 키워드가 포함되면 가장 긴(구체적인) 키워드를 사용합니다.
+    ("1큰술", "흑설탕", 12.0),
+    ("1큰술", "설탕", 12.75),
+    ("1큰술", "참깨", 9.0),
+    ("2개", "메추리알", 20.0),
+    ("1통", "마늘", 40.0),
+])
+def test_to_grams(text, ingredient, grams):
+    assert to_grams(text, ingredient) == pytest.approx(grams)
+
+
+def test_to_grams_unparseable_is_nan():
+    assert math.isnan(to_grams("모름", "소금"))
+
+
+def test_quantities_to_grams_matches_to_grams():
+    names = pd.Series(["국물용멸치", "두부", "간장", None, "달걀"])
+    capacities = pd.Series(["15마리", "두부 1모", "1큰술", "1,000g", None])
+    grams = quantities_to_grams(names, capacities)
+    expected = [to_grams(c, n) for n, c in zip(names.fillna(""), capacities)]
+    assert grams.tolist() == pytest.approx(expected, nan_ok=True)
@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+import benchmark
+from migrations import MIGRATIONS, check_query_plans, hot_queries, main, migrate, schema_version
+
+
+@pytest.fixture(scope="module")
+def synthetic_db(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("plans") / "synthetic.db")
+    benchmark.build_synthetic_db(db_path, 500, benchmark.StubEncoder())
+    return db_path
+
+
+def test_hot_queries_use_indexes(synthetic_db):
+    with sqlite3.connect(synthetic_db) as conn:
+        migrate(conn)
+        assert check_query_plans(conn) == []
+
+
+def test_migrate_is_idempotent(synthetic_db):
+    with sqlite3.connect(synthetic_db) as conn:
+        assert migrate(conn) == MIGRATIONS[-1][0]
+        assert migrate(conn) == schema_version(conn)
+
+
+def test_hot_queries_include_range_trends():
+    names = {name for name, _, _ in hot_queries()}
+    assert {"trend_range_keywords", "trend_range_views", "trend_range_keyword_dwell", "trend_range_recipe_names"} <= names
+
+
+def test_check_plans_on_fresh_db(tmp_path, capsys):
+    assert main(["check-plans", "--db", str(tmp_path / "fresh.db")]) == 1
+    assert "migrate" in capsys.readouterr().out
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from shared_index import SharedIndexReader, publish
+from snapshot import SnapshotError
+
+
+def _arrays(dim):
+    return {
+        "recipe_ids": np.arange(3, dtype=np.int64),
+        "names": np.array(["a", "b", "c"]),
+        "nation_codes": np.full(3, -1, dtype=np.int64),
+        "type_codes": np.full(3, -1, dtype=np.int64),
+        "calories": np.zeros(3, dtype=np.int64),
+        "cooking_times": np.zeros(3, dtype=np.int64),
+        "embeddings": np.eye(3, dim, dtype=np.float32),
+    }
+
+
+def test_reader_keeps_generation_of_its_model(tmp_path):
+    base_dir = str(tmp_path)
+    first = publish(_arrays(8), base_dir, model_name="model-a")
+    reader = SharedIndexReader(base_dir, check_interval=0, model_name="model-a")
+    assert reader.get().model_name == "model-a"
+
+    publish(_arrays(4), base_dir, model_name="model-b")
+    assert reader.generation == first
+    assert reader.get().generation == first
+    assert reader.get().embeddings.shape[1] == 8
+
+    with pytest.raises(SnapshotError):
+        SharedIndexReader(base_dir, model_name="model-a")
+    assert SharedIndexReader(base_dir, model_name="model-b").get().model_name == "model-b"
+
+
+def test_reader_follows_new_generation_of_same_model(tmp_path):
+    base_dir = str(tmp_path)
+    publish(_arrays(8), base_dir, model_name="model-a")
+    reader = SharedIndexReader(base_dir, check_interval=0, model_name="model-a")
+    second = publish(_arrays(8), base_dir, model_name="model-a")
+    assert reader.get().generation == second
+
+
+def test_ensure_published_publishes_first_generation_once(tmp_path):
+    import benchmark
+    from shared_index import current_generation, ensure_published
+
+    db_file = str(tmp_path / "catalogue.db")
+    benchmark.build_synthetic_db(db_file, 50, benchmark.StubEncoder(dim=8))
+    base_dir = str(tmp_path / "index")
+
+    generation = ensure_published(db_file, base_dir)
+    assert generation == current_generation(base_dir) == "gen-000001"
+    assert ensure_published(db_file, base_dir) == generation
+    assert len(SharedIndexReader(base_dir).get()) == 50